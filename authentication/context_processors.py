@@ -12,13 +12,14 @@ def salesforce_context(request):
     }
     
     # Add connection info if available
-    if hasattr(request, 'sf_connection'):
-        context['sf_connection'] = request.sf_connection
+    connection = getattr(request, 'sf_connection', None)
+    if connection:
+        context['sf_connection'] = connection
         context['sf_user_info'] = {
-            'username': request.sf_connection.salesforce_username,
-            'organization_name': request.sf_connection.organization_name,
-            'environment': request.sf_connection.get_environment_display(),
-            'api_version': request.sf_connection.api_version,
+            'username': connection.salesforce_username,
+            'organization_name': connection.organization_name,
+            'environment': connection.get_environment_display(),
+            'api_version': connection.api_version,
         }
     
     return context
\ No newline at end of file
@@ -1,7 +1,9 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
+from django.utils.functional import SimpleLazyObject
 from .models import SalesforceConnection
+from .utils import resolve_sf_connection
 import logging
 
 logger = logging.getLogger('workbench')
@@ -28,17 +30,15 @@ class SalesforceSessionMiddleware:
         ]
     
     def __call__(self, request):
+        # Always present, so views and templates can read it without a fallback lookup
+        request.sf_connection = None
+
         # Check if URL is exempt from authentication
         if any(request.path.startswith(url) for url in self.exempt_urls):
-            # For API endpoints, still try to attach the connection if available
+            # For API endpoints, attach the connection lazily so it is only
+            # looked up when the view actually uses it.
             if request.path.startswith('/query/api/'):
-                connection_id = request.session.get('sf_connection_id')
-                if connection_id:
-                    try:
-                        connection = SalesforceConnection.objects.get(id=connection_id, is_active=True)
-                        request.sf_connection = connection
-                    except SalesforceConnection.DoesNotExist:
-                        pass
+                request.sf_connection = SimpleLazyObject(lambda: resolve_sf_connection(request))
             return self.get_response(request)
         
         # Check if we have a Salesforce connection
@@ -51,7 +51,7 @@ class SalesforceSessionMiddleware:
         
         try:
             # Get connection and verify it's still active
-            connection = SalesforceConnection.objects.get(id=connection_id, is_active=True)
+            connection = SalesforceConnection.objects.defer('refresh_token').get(id=connection_id, is_active=True)
             
             # Add connection to request for easy access
             request.sf_connection = connection
@@ -5,10 +5,12 @@ Provides unified interface to Salesforce SOAP, REST, Bulk, and Streaming APIs
 
 import json
 import logging
+import re
 from typing import Any, Dict, List
 from urllib.parse import quote
 
 import requests
+from requests.adapters import HTTPAdapter
 from simple_salesforce import Salesforce
 from simple_salesforce.exceptions import SalesforceError
 from zeep import Client as SOAPClient
@@ -18,6 +20,9 @@ import xml.etree.ElementTree as ET
 
 logger = logging.getLogger('workbench')
 
+# Pulls the message out of a stringified Salesforce error payload.
+_SF_ERROR_MESSAGE_RE = re.compile(r"'message': '([^']+)'")
+
 
 def _to_18_char_id(sf_id: str | None) -> str | None:
     if not sf_id or len(sf_id) != 15:
@@ -223,6 +228,25 @@ METADATA_TYPE_OVERRIDES = {
 DEFAULT_METADATA_LOOKUP_FIELDS = ['QualifiedApiName', 'DeveloperName', 'Name', 'FullName']
 
 
+# Keep-alive connection pools shared by every client in the process. urllib3 keeps one
+# pool per org host and closes the least recently used one beyond pool_connections.
+# The adapter carries no headers, so clients on different threads cannot see each
+# other's tokens.
+_POOLED_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+
+
+def _pooled_session():
+    """
+    Return a new session for one client that sends through the shared connection
+    pools, so consecutive requests reuse kept-alive TLS connections to the org
+    instead of handshaking again for each view.
+    """
+    session = requests.Session()
+    session.mount('https://', _POOLED_ADAPTER)
+    session.mount('http://', _POOLED_ADAPTER)
+    return session
+
+
 class SalesforceAPIError(Exception):
     """Custom exception for Salesforce API errors"""
     pass
@@ -239,7 +263,8 @@ class SalesforceClient:
         Initialize with a SalesforceConnection model instance
         """
         self.connection = connection
-        self.session = requests.Session()
+        # The session is this client's own; only its connection pools are shared
+        self.session = _pooled_session()
         self._soap_client = None
         self._sf_client = None
         
@@ -346,7 +371,8 @@ class SalesforceClient:
             self._sf_client = Salesforce(
                 instance_url=self.connection.instance_url,
                 session_id=self.connection.get_access_token(),
-                version=self.connection.api_version
+                version=self.connection.api_version,
+                session=self.session,
             )
         return self._sf_client
     
@@ -367,8 +393,7 @@ class SalesforceClient:
             # Try to parse the error message for better formatting
             if 'MALFORMED_QUERY' in error_msg:
                 # Extract just the error message part
-                import re
-                match = re.search(r"'message': '([^']+)'", error_msg)
+                match = _SF_ERROR_MESSAGE_RE.search(error_msg)
                 if match:
                     error_detail = match.group(1).replace('\\n', '\n')
                     raise SalesforceAPIError(f"Malformed query:\n{error_detail}")
@@ -979,6 +1004,48 @@ class SalesforceClient:
             logger.error(f"REST request error: {e}")
             raise SalesforceAPIError(f"REST request failed: {e}")
     
+    def composite(self, subrequests, all_or_none=False, raise_on_error=True):
+        """
+        Execute several REST subrequests in one round-trip using the Composite API.
+
+        Each subrequest is a dict with ``method``, ``url`` (relative to the versioned
+        REST endpoint), ``referenceId`` and an optional ``body``. Returns the
+        subrequest response bodies keyed by ``referenceId``. A failed subrequest
+        raises SalesforceAPIError, or is logged and left out of the result when
+        ``raise_on_error`` is False.
+        """
+        base_path = f"/services/data/v{self.connection.api_version}"
+        composite_request = []
+        for subrequest in subrequests:
+            entry = {
+                'method': subrequest.get('method', 'GET'),
+                'url': f"{base_path}/{subrequest['url'].lstrip('/')}",
+                'referenceId': subrequest['referenceId'],
+            }
+            if 'body' in subrequest:
+                entry['body'] = subrequest['body']
+            composite_request.append(entry)
+
+        payload = self.rest_request('POST', 'composite', data={
+            'allOrNone': all_or_none,
+            'compositeRequest': composite_request,
+        })
+
+        results = {}
+        for item in payload.get('compositeResponse', []):
+            body = item.get('body')
+            if item.get('httpStatusCode', 500) >= 400:
+                message = body
+                if isinstance(body, list) and body and isinstance(body[0], dict):
+                    message = body[0].get('message')
+                error = f"Composite request {item.get('referenceId')} failed: {message}"
+                if raise_on_error:
+                    raise SalesforceAPIError(error)
+                logger.warning(error)
+                continue
+            results[item.get('referenceId')] = body
+        return results
+
     # Bulk API Methods
     def create_bulk_job(self, operation, object_type, external_id_field=None):
         """
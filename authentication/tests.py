@@ -1,3 +1,195 @@
-from django.test import TestCase
+from unittest.mock import MagicMock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from .middleware import SalesforceSessionMiddleware
+from .models import SalesforceConnection
+from .salesforce_client import SalesforceAPIError, SalesforceClient
+from .utils import get_salesforce_connection, resolve_sf_connection
+
+
+class SalesforceClientCompositeTests(SimpleTestCase):
+    def setUp(self):
+        connection = SalesforceConnection(
+            session_id='SESSION123',
+            server_url='https://example.salesforce.com',
+            instance_url='https://example.salesforce.com',
+            api_version='62.0',
+        )
+        self.client = SalesforceClient(connection)
+        self.client.session = MagicMock()
+
+    def _respond_with(self, payload):
+        response = MagicMock()
+        response.json.return_value = payload
+        self.client.session.post.return_value = response
+
+    def test_composite_posts_versioned_subrequests(self):
+        self._respond_with({
+            'compositeResponse': [
+                {'referenceId': 'describe', 'httpStatusCode': 200, 'body': {'name': 'Account'}},
+                {'referenceId': 'record', 'httpStatusCode': 200, 'body': {'records': []}},
+            ]
+        })
+
+        results = self.client.composite([
+            {'method': 'GET', 'url': 'sobjects/Account/describe', 'referenceId': 'describe'},
+            {'method': 'GET', 'url': '/query/?q=SELECT+Id+FROM+Account', 'referenceId': 'record'},
+        ])
+
+        self.assertEqual(results, {'describe': {'name': 'Account'}, 'record': {'records': []}})
+        url = self.client.session.post.call_args.args[0]
+        body = self.client.session.post.call_args.kwargs['json']
+        self.assertEqual(url, 'https://example.salesforce.com/services/data/v62.0/composite')
+        self.assertEqual(
+            [sub['url'] for sub in body['compositeRequest']],
+            [
+                '/services/data/v62.0/sobjects/Account/describe',
+                '/services/data/v62.0/query/?q=SELECT+Id+FROM+Account',
+            ],
+        )
+
+    def test_composite_raises_on_failed_subrequest(self):
+        self._respond_with({
+            'compositeResponse': [
+                {
+                    'referenceId': 'record',
+                    'httpStatusCode': 400,
+                    'body': [{'message': 'invalid ID field', 'errorCode': 'INVALID_QUERY_FILTER_OPERATOR'}],
+                },
+            ]
+        })
+
+        with self.assertRaisesMessage(SalesforceAPIError, 'invalid ID field'):
+            self.client.composite([{'method': 'GET', 'url': 'query/?q=x', 'referenceId': 'record'}])
+
+    def test_composite_can_leave_out_failed_subrequests(self):
+        self._respond_with({
+            'compositeResponse': [
+                {'referenceId': 'Account', 'httpStatusCode': 200, 'body': {'name': 'Account'}},
+                {'referenceId': 'Bogus__c', 'httpStatusCode': 404, 'body': [{'message': 'not found'}]},
+            ]
+        })
+
+        results = self.client.composite(
+            [
+                {'method': 'GET', 'url': 'sobjects/Account/describe', 'referenceId': 'Account'},
+                {'method': 'GET', 'url': 'sobjects/Bogus__c/describe', 'referenceId': 'Bogus__c'},
+            ],
+            raise_on_error=False,
+        )
+
+        self.assertEqual(results, {'Account': {'name': 'Account'}})
+
+
+class SalesforceClientSessionTests(SimpleTestCase):
+    def _connection(self, pk=None):
+        return SalesforceConnection(
+            id=pk,
+            session_id=f'SESSION{pk}',
+            server_url='https://example.salesforce.com',
+            instance_url='https://example.salesforce.com',
+        )
+
+    def test_clients_share_connection_pools(self):
+        first = SalesforceClient(self._connection(101))
+        other = SalesforceClient(self._connection(102))
+
+        self.assertIsNot(first.session, other.session)
+        self.assertIs(
+            first.session.get_adapter('https://example.salesforce.com'),
+            other.session.get_adapter('https://example.salesforce.com'),
+        )
+
+    def test_refreshed_token_stays_with_its_client(self):
+        stale = self._connection(101)
+        stale.set_access_token('STALE')
+        fresh = self._connection(101)
+        fresh.set_access_token('FRESH')
+
+        fresh_client = SalesforceClient(fresh)
+        SalesforceClient(stale)
+
+        self.assertEqual(fresh_client.session.headers['Authorization'], 'Bearer FRESH')
+
+
+class ResolveConnectionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tester', password='password123')
+        self.session_connection = SalesforceConnection.objects.create(
+            user=self.user,
+            session_id='SESSION123',
+            server_url='https://example.salesforce.com',
+            instance_url='https://example.salesforce.com',
+        )
+        self.latest_connection = SalesforceConnection.objects.create(
+            user=self.user,
+            session_id='SESSION456',
+            server_url='https://example.salesforce.com',
+            instance_url='https://example.salesforce.com',
+        )
+        self.request = RequestFactory().get('/query/api/objects/')
+        self.request.user = self.user
+
+    def test_prefers_session_connection_in_one_query(self):
+        self.request.session = {'sf_connection_id': self.session_connection.id}
+
+        with self.assertNumQueries(1):
+            connection = resolve_sf_connection(self.request)
+
+        self.assertEqual(connection, self.session_connection)
+        self.assertEqual(connection.get_deferred_fields(), {'refresh_token'})
+
+    def test_falls_back_to_latest_active_user_connection(self):
+        self.request.session = {}
+
+        self.assertEqual(resolve_sf_connection(self.request), self.latest_connection)
+
+
+class GetSalesforceConnectionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='tester', password='password123')
+
+    def _create_connection(self, session_id, **kwargs):
+        return SalesforceConnection.objects.create(
+            user=self.user,
+            session_id=session_id,
+            server_url='https://example.salesforce.com',
+            instance_url='https://example.salesforce.com',
+            **kwargs,
+        )
+
+    def test_prefers_active_connection_in_one_query(self):
+        active = self._create_connection('SESSION123')
+        self._create_connection('SESSION456', is_active=False)
+
+        with self.assertNumQueries(1):
+            connection = get_salesforce_connection(self.user)
+
+        self.assertEqual(connection, active)
+
+    def test_falls_back_to_latest_inactive_connection(self):
+        self._create_connection('SESSION123', is_active=False)
+        latest = self._create_connection('SESSION456', is_active=False)
+
+        self.assertEqual(get_salesforce_connection(self.user), latest)
+
+    def test_refresh_token_loads_on_demand(self):
+        connection = self._create_connection('SESSION123')
+        connection.set_refresh_token('REFRESH')
+        connection.save()
+
+        loaded = get_salesforce_connection(self.user)
+
+        self.assertIn('refresh_token', loaded.get_deferred_fields())
+        with self.assertNumQueries(1):
+            self.assertEqual(loaded.get_refresh_token(), 'REFRESH')
+
+
+class SalesforceSessionMiddlewareTests(SimpleTestCase):
+    def test_exempt_paths_get_an_empty_connection_attribute(self):
+        request = RequestFactory().get('/auth/login/')
+        middleware = SalesforceSessionMiddleware(lambda req: req.sf_connection)
+
+        self.assertIsNone(middleware(request))
@@ -1,5 +1,6 @@
 from simple_salesforce import Salesforce
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Case, IntegerField, Q, Value, When
 
 from .models import SalesforceConnection
 
@@ -12,17 +13,14 @@ def _select_salesforce_connection(user):
     if user is None or not getattr(user, "is_authenticated", False):
         raise ObjectDoesNotExist("User must be authenticated to access Salesforce.")
 
+    # Active connections sort first, so the fallback needs no second query.
+    # The refresh token is only read when renewing the access token.
     connection = (
-        SalesforceConnection.objects.filter(user=user, is_active=True)
-        .order_by("-updated_at")
+        SalesforceConnection.objects.defer("refresh_token")
+        .filter(user=user)
+        .order_by("-is_active", "-updated_at")
         .first()
     )
-    if connection is None:
-        connection = (
-            SalesforceConnection.objects.filter(user=user)
-            .order_by("-updated_at")
-            .first()
-        )
 
     if connection is None:
         raise ObjectDoesNotExist("No Salesforce connection found for user. Please login first.")
@@ -61,3 +59,35 @@ def get_salesforce_client(user):
 def get_salesforce_connection(user):
     """Return the most recent Salesforce connection for the user."""
     return _select_salesforce_connection(user)
+
+
+def resolve_sf_connection(request):
+    """
+    Return the active Salesforce connection for a request using a single query.
+
+    The session's connection wins; otherwise the user's most recently updated
+    active connection is used. Returns None when neither exists.
+    """
+    connection_id = request.session.get('sf_connection_id')
+    criteria = Q()
+    if connection_id:
+        criteria |= Q(id=connection_id)
+    if request.user.is_authenticated:
+        criteria |= Q(user=request.user)
+    if not criteria:
+        return None
+
+    # The refresh token is only read when the access token is renewed, so it is
+    # left out of the per-request row and loaded on demand.
+    queryset = SalesforceConnection.objects.defer('refresh_token').filter(criteria, is_active=True)
+    ordering = ['-updated_at']
+    if connection_id:
+        queryset = queryset.annotate(
+            session_rank=Case(
+                When(id=connection_id, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        ordering.insert(0, 'session_rank')
+    return queryset.order_by(*ordering).first()
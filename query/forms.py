@@ -1,6 +1,13 @@
+import re
+
 from django import forms
 from .models import SavedQuery
 
+# Compiled once at import; QueryForm.clean_query runs on every query POST.
+_FROM_CLAUSE_RE = re.compile(r'\s+FROM\s+', re.IGNORECASE)
+_COMMA_BEFORE_FROM_RE = re.compile(r',\s*FROM\s', re.IGNORECASE)
+_EMPTY_SELECT_RE = re.compile(r'SELECT\s+FROM\s', re.IGNORECASE)
+
 
 class QueryForm(forms.Form):
     """SOQL Query Form"""
@@ -35,17 +42,16 @@ class QueryForm(forms.Form):
             raise forms.ValidationError('クエリは SELECT で開始する必要があります。')
 
         # Improved validation: Allow FROM to be preceded/followed by any whitespace (including newlines)
-        import re
-        if not re.search(r'\s+FROM\s+', query, re.IGNORECASE):
+        if not _FROM_CLAUSE_RE.search(query):
             raise forms.ValidationError('クエリには正しいスペース或者换行付きの FROM 句が必要です。')
 
         # Check for common syntax errors
         # Check if there's a comma right before FROM
-        if re.search(r',\s*FROM\s', query, re.IGNORECASE):
+        if _COMMA_BEFORE_FROM_RE.search(query):
             raise forms.ValidationError('構文エラー: FROM の前のカンマを削除してください。')
 
         # Check for SELECT without any fields
-        select_from_pattern = re.search(r'SELECT\s+FROM\s', query, re.IGNORECASE)
+        select_from_pattern = _EMPTY_SELECT_RE.search(query)
         if select_from_pattern:
             raise forms.ValidationError('SELECT には少なくとも1つの項目を指定してください。')
 
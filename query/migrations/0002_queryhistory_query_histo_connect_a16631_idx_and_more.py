@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-15 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='queryhistory',
+            index=models.Index(fields=['connection', 'query_type', '-executed_at'], name='query_histo_connect_a16631_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savedquery',
+            index=models.Index(fields=['user', 'query_type', '-updated_at'], name='saved_queri_user_id_7a510b_idx'),
+        ),
+    ]
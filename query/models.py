@@ -27,6 +27,9 @@ class SavedQuery(models.Model):
     class Meta:
         db_table = 'saved_queries'
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', 'query_type', '-updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.query_type.upper()})"
@@ -60,6 +63,9 @@ class QueryHistory(models.Model):
     class Meta:
         db_table = 'query_history'
         ordering = ['-executed_at']
+        indexes = [
+            models.Index(fields=['connection', 'query_type', '-executed_at']),
+        ]
     
     def __str__(self):
         return f"{self.query_type.upper()} - {self.status} ({self.executed_at})"
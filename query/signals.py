@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from authentication.models import SalesforceConnection
+from .utils import describe_scope, enqueue_task
+
+# Logins save the connection more than once; only enqueue one prewarm per scope and window.
+PREWARM_DEBOUNCE_SECONDS = 60
+
+
+@receiver(post_save, sender=SalesforceConnection)
+def prewarm_describe_cache(sender, instance, **kwargs):
+    """Warm the describe cache whenever an active connection is saved."""
+    # Without Celery the views describe on demand instead
+    if not settings.USE_CELERY or not instance.is_active or not instance.access_token:
+        return
+    # Each save can move the connection to a new describe scope, so the debounce is
+    # per scope and the task skips scopes a later save has already retired.
+    scope = describe_scope(instance)
+    if not cache.add(f"sf_prewarm_lock:{scope}", True, PREWARM_DEBOUNCE_SECONDS):
+        return
+    connection_id = instance.id
+    transaction.on_commit(lambda: enqueue_task('prewarm_describe', connection_id, scope))
@@ -0,0 +1,55 @@
+"""
+Background tasks for the query app.
+"""
+
+import logging
+
+from celery import shared_task
+
+from authentication.models import SalesforceConnection
+from authentication.salesforce_client import SalesforceClient, SalesforceAPIError
+from .models import QueryHistory
+from .utils import describe_scope, get_object_list, invalidate_index_page, prime_field_payloads
+
+logger = logging.getLogger('workbench')
+
+# Objects whose field describes are warmed alongside the global describe.
+PREWARM_SOBJECTS = ('Account', 'Contact', 'Lead', 'Opportunity', 'Case', 'User')
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60, acks_late=True)
+def prewarm_describe(self, connection_id, scope=None):
+    """
+    Populate the describe cache for a connection so the first page load is a cache hit.
+    ``scope`` is the describe scope the prewarm was enqueued for; if the connection
+    has been saved again since, a newer prewarm covers it and this one is skipped.
+    """
+    connection = (
+        SalesforceConnection.objects.defer('refresh_token')
+        .filter(id=connection_id, is_active=True)
+        .first()
+    )
+    if connection is None or (scope is not None and describe_scope(connection) != scope):
+        return
+
+    client = SalesforceClient(connection)
+    try:
+        objects = get_object_list(client, refresh=True)
+        available = {obj['name'] for obj in objects}
+        # The field describes are independent, so they share one composite request
+        object_names = [name for name in PREWARM_SOBJECTS if name in available]
+        failed = prime_field_payloads(client, object_names)
+        if failed:
+            # Not worth a retry: the views describe these on demand
+            logger.warning("Describe prewarm skipped %s for connection %s", ', '.join(failed), connection_id)
+    except SalesforceAPIError as exc:
+        logger.warning("Describe prewarm failed for connection %s: %s", connection_id, exc)
+        raise self.retry(exc=exc)
+
+
+@shared_task(acks_late=True, ignore_result=True)
+def record_query_history(connection_id, user_id=None, **fields):
+    """Insert a QueryHistory row that was deferred off the request path."""
+    QueryHistory.objects.create(connection_id=connection_id, **fields)
+    if user_id is not None:
+        invalidate_index_page(user_id)
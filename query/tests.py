@@ -1,3 +1,954 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from authentication.models import SalesforceConnection
+from authentication.salesforce_client import SalesforceAPIError
+from .models import QueryHistory, SavedQuery
+from .tasks import prewarm_describe
+from .utils import (
+    LookaheadPaginator, describe_scope, fields_cache_key, get_object_list, get_object_names, objects_cache_key,
+    prime_field_payloads,
+)
+from .views import _parse_soql_columns, flatten_record
+
+
+# Keeps cache reads out of assertNumQueries counts (the default cache is database-backed).
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class SalesforceSessionTestCase(TestCase):
+    """Logs in a user with an active Salesforce connection in the session."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            email='tester@example.com',
+            password='password123',
+        )
+        self.client.force_login(self.user)
+
+        self.connection = SalesforceConnection.objects.create(
+            user=self.user,
+            session_id='SESSION123',
+            server_url='https://example.salesforce.com',
+            login_type='oauth',
+            environment='production',
+            api_version='62.0',
+            instance_url='https://example.salesforce.com',
+        )
+        session = self.client.session
+        session['sf_connection_id'] = self.connection.id
+        session.save()
+
+
+class FlattenRecordTests(SimpleTestCase):
+    def test_flattens_nested_lookups_in_order(self):
+        record = {
+            'attributes': {'type': 'Contact'},
+            'Id': '003000000000001AAA',
+            'Account': {
+                'attributes': {'type': 'Account'},
+                'Name': 'Acme',
+                'Owner': {'attributes': {'type': 'User'}, 'Name': 'Alice'},
+                'Industry': 'Energy',
+            },
+            'Email': 'a@example.com',
+        }
+
+        self.assertEqual(
+            list(flatten_record(record).items()),
+            [
+                ('Id', '003000000000001AAA'),
+                ('Account.Name', 'Acme'),
+                ('Account.Owner.Name', 'Alice'),
+                ('Account.Industry', 'Energy'),
+                ('Email', 'a@example.com'),
+            ],
+        )
+
+    def test_flat_record_drops_attributes_and_tracks_columns(self):
+        record = {'attributes': {'type': 'Account'}, 'Id': '001000000000001AAA', 'Name': None}
+        columns, seen = ['Name'], {'Name'}
+
+        self.assertEqual(flatten_record(record, columns=columns, seen=seen), {'Id': '001000000000001AAA', 'Name': None})
+        self.assertEqual(columns, ['Name', 'Id'])
+
+    def test_keeps_subquery_records_whole(self):
+        children = [{'attributes': {'type': 'Contact'}, 'Id': '003000000000001AAA'}]
+        record = {'Id': '001000000000001AAA', 'Contacts': {'totalSize': 1, 'done': True, 'records': children}}
+
+        self.assertEqual(flatten_record(record), {'Id': '001000000000001AAA', 'Contacts': children})
+
+    def test_flattens_ordered_dicts_from_simple_salesforce(self):
+        record = OrderedDict([
+            ('attributes', OrderedDict([('type', 'Contact')])),
+            ('Id', '003000000000001AAA'),
+            ('Account', OrderedDict([('attributes', OrderedDict()), ('Name', 'Acme')])),
+        ])
+
+        self.assertEqual(flatten_record(record), {'Id': '003000000000001AAA', 'Account.Name': 'Acme'})
+
+
+class DescribeEndpointTests(SalesforceSessionTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch('query.views.SalesforceClient')
+        self.mock_client_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Cache keys are built from the client's connection, as in production
+        self.mock_client_cls.return_value.connection = self.connection
+
+    def test_get_objects_returns_etag_and_304(self):
+        mock_sf = self.mock_client_cls.return_value
+        mock_sf.describe_global.return_value = {
+            'sobjects': [
+                {'name': 'Contact', 'label': 'Contact', 'queryable': True, 'keyPrefix': '003'},
+                {'name': 'Account', 'label': 'Account', 'queryable': True, 'keyPrefix': '001'},
+                {'name': 'Hidden', 'label': 'Hidden', 'queryable': False},
+            ]
+        }
+        url = reverse('query:get_objects')
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([obj['name'] for obj in data['objects']], ['Account', 'Contact'])
+        etag = response['ETag']
+        self.assertTrue(etag)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        mock_sf.describe_global.assert_called_once()
+
+    def test_describe_endpoints_require_a_connection(self):
+        self.connection.is_active = False
+        self.connection.save()
+
+        objects = self.client.get(reverse('query:get_objects'))
+        fields = self.client.get(reverse('query:get_object_fields'), {'object': 'Account'})
+
+        self.assertEqual(objects.status_code, 401)
+        self.assertEqual(fields.status_code, 401)
+        self.assertFalse(objects.json()['success'])
+        self.mock_client_cls.assert_not_called()
+
+    def test_get_objects_pages_the_sorted_list(self):
+        self.mock_client_cls.return_value.describe_global.return_value = {
+            'sobjects': [{'name': f'Obj{i}__c', 'label': f'Object {i}', 'queryable': True} for i in range(5)],
+        }
+        url = reverse('query:get_objects')
+
+        first = self.client.get(url, {'page': 0, 'size': 2}).json()
+        last = self.client.get(url, {'page': 2, 'size': 2}).json()
+
+        self.assertEqual([obj['name'] for obj in first['objects']], ['Obj0__c', 'Obj1__c'])
+        self.assertTrue(first['has_more'])
+        self.assertEqual(first['next_page'], 1)
+        self.assertEqual([obj['name'] for obj in last['objects']], ['Obj4__c'])
+        self.assertFalse(last['has_more'])
+        self.assertEqual(last['total'], 5)
+        self.mock_client_cls.return_value.describe_global.assert_called_once()
+
+    def test_paged_refresh_retires_the_stored_etag(self):
+        self.mock_client_cls.return_value.describe_global.return_value = {
+            'sobjects': [{'name': 'Account', 'label': 'Account', 'queryable': True}],
+        }
+        url = reverse('query:get_objects')
+        etag = self.client.get(url)['ETag']
+
+        self.client.get(url, {'page': 0, 'refresh': 1})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.mock_client_cls.return_value.describe_global.call_count, 2)
+
+    def test_get_objects_serves_cached_body_across_sessions(self):
+        mock_sf = self.mock_client_cls.return_value
+        mock_sf.describe_global.return_value = {
+            'sobjects': [{'name': 'Account', 'label': 'Account', 'queryable': True}],
+        }
+        url = reverse('query:get_objects')
+
+        first = self.client.get(url)
+        # A fresh login on the same connection gets a new session cookie
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['sf_connection_id'] = self.connection.id
+        session.save()
+        second = self.client.get(url)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.mock_client_cls.assert_called_once()
+
+    def test_get_object_fields_is_cached(self):
+        mock_sf = self.mock_client_cls.return_value
+        mock_sf.describe_sobject.return_value = {
+            'fields': [
+                {'name': 'Name', 'label': 'Name', 'type': 'string'},
+                {'name': 'Id', 'label': 'ID', 'type': 'id'},
+            ],
+        }
+        url = reverse('query:get_object_fields')
+
+        first = self.client.get(url, {'object': 'Account'})
+        second = self.client.get(url, {'object': 'Account'})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([f['name'] for f in second.json()['fields']], ['Id', 'Name'])
+        mock_sf.describe_sobject.assert_called_once_with('Account')
+
+    @patch('query.views.hashlib.blake2b', wraps=hashlib.blake2b)
+    def test_get_object_fields_reuses_stored_etag(self, mock_blake2b):
+        self.mock_client_cls.return_value.describe_sobject.return_value = {
+            'fields': [{'name': 'Name', 'label': 'Name', 'type': 'string'}],
+        }
+        url = reverse('query:get_object_fields')
+
+        first = self.client.get(url, {'object': 'Account'})
+        second = self.client.get(url, {'object': 'Account'})
+
+        self.assertEqual(second['ETag'], first['ETag'])
+        mock_blake2b.assert_called_once()
+
+    def test_cached_fields_body_is_served_pregzipped(self):
+        self.mock_client_cls.return_value.describe_sobject.return_value = {
+            'fields': [{'name': f'Field{i}__c', 'label': f'Field {i}', 'type': 'string'} for i in range(20)],
+        }
+        url = reverse('query:get_object_fields')
+
+        first = self.client.get(url, {'object': 'Account'})
+        second = self.client.get(url, {'object': 'Account'}, HTTP_ACCEPT_ENCODING='gzip, br')
+        not_modified = self.client.get(url, {'object': 'Account'}, HTTP_IF_NONE_MATCH=second['ETag'])
+
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(second.content), first.content)
+        self.assertEqual(second['ETag'], 'W/' + first['ETag'])
+        self.assertIn('Accept-Encoding', second['Vary'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_get_object_fields_refresh_bypasses_cache(self):
+        mock_sf = self.mock_client_cls.return_value
+        mock_sf.describe_sobject.side_effect = [
+            {'fields': [{'name': 'Name', 'label': 'Name', 'type': 'string'}]},
+            {'fields': [{'name': 'Name', 'label': 'Name', 'type': 'string'}, {'name': 'New__c', 'label': 'New'}]},
+        ]
+        url = reverse('query:get_object_fields')
+
+        etag = self.client.get(url, {'object': 'Account'})['ETag']
+        refreshed = self.client.get(url, {'object': 'Account', 'refresh': '1'}, HTTP_IF_NONE_MATCH=etag)
+        cached = self.client.get(url, {'object': 'Account'})
+
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual([f['name'] for f in refreshed.json()['fields']], ['Name', 'New__c'])
+        self.assertEqual(cached.content, refreshed.content)
+        self.assertEqual(mock_sf.describe_sobject.call_count, 2)
+
+    def test_falls_back_to_latest_user_connection(self):
+        mock_sf = self.mock_client_cls.return_value
+        mock_sf.describe_global.return_value = {'sobjects': []}
+        session = self.client.session
+        del session['sf_connection_id']
+        session.save()
+
+        response = self.client.get(reverse('query:get_objects'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.mock_client_cls.call_args.args[0], self.connection)
+
+
+class ParseSoqlColumnsTests(SimpleTestCase):
+    def test_splits_on_top_level_commas_only(self):
+        query = (
+            "SELECT Id, Account.Name, FORMAT(Amount) amt, "
+            "(SELECT Id, Email FROM Contacts WHERE Name IN ('a, b')), "
+            "DISTANCE(Location__c, GEOLOCATION(37.7, -122.4), 'mi') dist\n"
+            "FROM Opportunity"
+        )
+
+        self.assertEqual(_parse_soql_columns(query), ('Id', 'Account.Name', 'amt', 'Contacts', 'dist'))
+
+    def test_returns_nothing_without_select_list(self):
+        self.assertEqual(_parse_soql_columns('FIND {Acme}'), ())
+        self.assertEqual(_parse_soql_columns('SELECT Id'), ())
+
+
+class DescribeCacheTests(SalesforceSessionTestCase):
+    def test_saving_connection_retires_cached_object_list(self):
+        mock_sf = MagicMock()
+        mock_sf.connection = self.connection
+        mock_sf.describe_global.return_value = {'sobjects': []}
+
+        get_object_list(mock_sf)
+        get_object_list(mock_sf)
+        # A later login or token refresh saves the connection and moves updated_at forward
+        self.connection.updated_at += timedelta(seconds=5)
+        get_object_list(mock_sf)
+
+        self.assertEqual(mock_sf.describe_global.call_count, 2)
+
+    def test_object_names_are_cached_by_lowercase_name(self):
+        mock_sf = MagicMock()
+        mock_sf.connection = self.connection
+        mock_sf.describe_global.return_value = {
+            'sobjects': [
+                {'name': 'Account', 'label': 'Account', 'queryable': True},
+                {'name': 'AccountHistory', 'label': 'Account History', 'queryable': False},
+            ],
+        }
+
+        self.assertEqual(get_object_names(mock_sf), {'account': 'Account'})
+        cache.delete(objects_cache_key(self.connection))
+        self.assertEqual(get_object_names(mock_sf), {'account': 'Account'})
+
+        mock_sf.describe_global.assert_called_once()
+
+
+class QueryIndexViewTests(SalesforceSessionTestCase):
+    @patch('query.views.SalesforceClient')
+    def test_get_does_not_call_salesforce(self, mock_client_cls):
+        response = self.client.get(reverse('query:index'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'data-has-initial="false"')
+        mock_client_cls.assert_not_called()
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_sidebar_query_count_does_not_grow_with_rows(self):
+        for i in range(5):
+            QueryHistory.objects.create(
+                connection=self.connection, query_text=f'SELECT Id FROM Account LIMIT {i}', query_type='soql',
+            )
+            SavedQuery.objects.create(
+                user=self.user, name=f'Saved {i}', query_text='SELECT Id FROM Contact', query_type='soql',
+            )
+
+        # Session, user and connection lookups, then one query per sidebar list
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('query:index'))
+
+        self.assertEqual(len(response.context['recent_queries']), 5)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    @patch('query.views.SalesforceClient')
+    def test_rendered_page_is_reused_until_history_changes(self, mock_client_cls):
+        mock_client_cls.return_value.query.return_value = {'totalSize': 0, 'done': True, 'records': []}
+        url = reverse('query:index')
+
+        first = self.client.get(url)
+        # Only the session, connection and user lookups; the sidebar queries are skipped
+        with self.assertNumQueries(3):
+            cached = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'query': 'SELECT Id FROM Account'})
+        # Drain the flash message so the next GET is cacheable again
+        self.client.get(url)
+        refreshed = self.client.get(url)
+
+        self.assertEqual(cached.content, first.content)
+        self.assertNotIn(b'SELECT Id FROM Account', first.content)
+        self.assertIn(b'SELECT Id FROM Account', refreshed.content)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cached_page_keeps_the_csrf_cookie(self):
+        url = reverse('query:index')
+        first = self.client.get(url)
+
+        hit = self.client.get(url)
+        del self.client.cookies[settings.CSRF_COOKIE_NAME]
+        reissued = self.client.get(url)
+
+        self.assertEqual(hit.content, first.content)
+        self.assertIn(settings.CSRF_COOKIE_NAME, hit.cookies)
+        self.assertIn('Cookie', hit['Vary'])
+        # A new CSRF secret gets a freshly rendered page carrying a matching token
+        self.assertIn(settings.CSRF_COOKIE_NAME, reissued.cookies)
+        self.assertNotEqual(reissued.content, first.content)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    @patch('query.views.SalesforceClient')
+    def test_cached_page_is_retired_only_after_the_history_write(self, mock_client_cls):
+        mock_client_cls.return_value.query.side_effect = SalesforceAPIError('INVALID_FIELD')
+        url = reverse('query:index')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(url, {'query': 'SELECT Bogus__c FROM Account'})
+            self.client.get(url)
+            # Before the deferred write, the page rendered here must stay under the old revision
+            stale = self.client.get(url)
+        # Commit: the history row is written, then the revision bumped
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        refreshed = self.client.get(url)
+
+        self.assertNotIn(b'SELECT Bogus__c FROM Account', stale.content)
+        self.assertIn(b'SELECT Bogus__c FROM Account', refreshed.content)
+
+    @patch('query.views.SalesforceClient')
+    def test_post_builds_columns_from_select_and_sparse_lookups(self, mock_client_cls):
+        mock_client_cls.return_value.query.return_value = {
+            'totalSize': 2,
+            'done': True,
+            'records': [
+                {'attributes': {'type': 'Account'}, 'Id': '001000000000001AAA', 'Name': 'Acme', 'Owner': None},
+                {
+                    'attributes': {'type': 'Account'},
+                    'Id': '001000000000002AAA',
+                    'Name': 'Globex',
+                    'Owner': {'attributes': {'type': 'User'}, 'Name': 'Alice'},
+                },
+            ],
+        }
+
+        response = self.client.post(reverse('query:index'), {'query': 'SELECT Id, Name, Owner.Name FROM Account'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results']['columns'], ['Id', 'Name', 'Owner.Name', 'Owner'])
+
+    @patch('query.views.SalesforceClient')
+    def test_post_with_no_records_renders_empty_result(self, mock_client_cls):
+        mock_client_cls.return_value.query.return_value = {'totalSize': 0, 'done': True, 'records': []}
+
+        response = self.client.post(reverse('query:index'), {'query': 'SELECT Id FROM Account'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results']['columns'], [])
+
+    @override_settings(USE_CELERY=True)
+    @patch('query.tasks.record_query_history.apply_async')
+    @patch('query.views.SalesforceClient')
+    def test_failed_query_history_is_written_after_commit(self, mock_client_cls, mock_apply_async):
+        mock_client_cls.return_value.query.side_effect = SalesforceAPIError('INVALID_FIELD')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('query:index'), {'query': 'SELECT Bogus__c FROM Account'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form']['query'].value(), 'SELECT Bogus__c FROM Account')
+        self.assertFalse(QueryHistory.objects.exists())
+        mock_apply_async.assert_called_once()
+        args, kwargs = mock_apply_async.call_args.args
+        self.assertEqual(args, (self.connection.id, self.user.id))
+        self.assertEqual(kwargs['status'], 'error')
+        self.assertEqual(mock_apply_async.call_args.kwargs, {'retry': False})
+
+    @patch('query.tasks.record_query_history.apply_async')
+    @patch('query.views.SalesforceClient')
+    def test_failed_query_history_is_written_inline_without_celery(self, mock_client_cls, mock_apply_async):
+        mock_client_cls.return_value.query.side_effect = SalesforceAPIError('INVALID_FIELD')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('query:index'), {'query': 'SELECT Bogus__c FROM Account'})
+
+        mock_apply_async.assert_not_called()
+        self.assertEqual(QueryHistory.objects.get().status, 'error')
+
+
+class SearchViewTests(SalesforceSessionTestCase):
+    def test_get_sidebar_runs_fixed_number_of_queries(self):
+        for i in range(5):
+            QueryHistory.objects.create(
+                connection=self.connection, query_text=f'FIND {{Acme{i}}}', query_type='sosl',
+            )
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('query:search'))
+
+        self.assertEqual(len(response.context['recent_searches']), 5)
+
+    @patch('query.views.SalesforceClient')
+    def test_post_groups_results_and_counts_records(self, mock_client_cls):
+        mock_client_cls.return_value.search.return_value = [
+            {'attributes': {'type': 'Account'}, 'Id': '001000000000001AAA', 'Name': 'Acme'},
+            {'attributes': {'type': 'Contact'}, 'Id': '003000000000001AAA', 'Name': 'Alice'},
+            {'attributes': {'type': 'Account'}, 'Id': '001000000000002AAA', 'Name': 'Globex', 'Phone': '555'},
+        ]
+
+        response = self.client.post(reverse('query:search'), {'search_query': 'FIND {Acme} IN ALL FIELDS'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['search_summary']['total_records'], 3)
+        self.assertEqual(
+            [(group['object_type'], group['count']) for group in response.context['grouped_results']],
+            [('Account', 2), ('Contact', 1)],
+        )
+        self.assertEqual(response.context['grouped_results'][0]['field_names'], ['Id', 'Name', 'Phone'])
+        self.assertEqual(QueryHistory.objects.get().record_count, 3)
+
+
+class LookaheadPaginatorTests(SalesforceSessionTestCase):
+    def setUp(self):
+        super().setUp()
+        QueryHistory.objects.bulk_create([
+            QueryHistory(connection=self.connection, query_text=f'SELECT Id FROM Account LIMIT {i}', status='success')
+            for i in range(5)
+        ])
+        self.queryset = QueryHistory.objects.order_by('id')
+
+    def test_pages_without_counting(self):
+        paginator = LookaheadPaginator(self.queryset, 2)
+
+        with self.assertNumQueries(1):
+            page = paginator.get_page(2)
+
+        self.assertEqual(len(page), 2)
+        self.assertTrue(page.has_previous())
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.next_page_number(), 3)
+
+    def test_last_and_out_of_range_pages(self):
+        paginator = LookaheadPaginator(self.queryset, 2)
+
+        last = paginator.get_page(3)
+        self.assertEqual(len(last), 1)
+        self.assertFalse(last.has_next())
+
+        self.assertEqual(paginator.get_page(9).number, 1)
+        self.assertEqual(paginator.get_page('abc').number, 1)
+
+    def test_reused_paginator_follows_each_page(self):
+        paginator = LookaheadPaginator(self.queryset, 2)
+
+        self.assertTrue(paginator.get_page(1).has_next())
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertTrue(paginator.get_page(2).has_next())
+        self.assertEqual(paginator.num_pages, 3)
+
+
+class SavedQueryViewTests(SalesforceSessionTestCase):
+    def test_saves_multiple_queries_at_once(self):
+        response = self.client.post(reverse('query:saved_queries'), {
+            'name[]': ['Accounts', 'Contacts'],
+            'query_text[]': ['SELECT Id FROM Account', 'SELECT Id FROM Contact'],
+        })
+
+        self.assertRedirects(response, reverse('query:saved_queries'), fetch_redirect_response=False)
+        self.assertEqual(
+            list(SavedQuery.objects.filter(user=self.user).order_by('name').values_list('name', 'query_type')),
+            [('Accounts', 'soql'), ('Contacts', 'soql')],
+        )
+
+    def test_rejects_batch_with_invalid_row(self):
+        self.client.post(reverse('query:saved_queries'), {
+            'name[]': ['Accounts', ''],
+            'query_text[]': ['SELECT Id FROM Account', 'SELECT Id FROM Contact'],
+        })
+
+        self.assertFalse(SavedQuery.objects.exists())
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_invalid_query_redirects_with_errors(self):
+        # Session and connection lookups only; the saved query list is not rebuilt
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('query:saved_queries'), {'name': '', 'query_text': ''})
+
+        self.assertRedirects(response, reverse('query:saved_queries'), fetch_redirect_response=False)
+        self.assertFalse(SavedQuery.objects.exists())
+
+    def test_load_redirects_by_query_type(self):
+        soql = SavedQuery.objects.create(user=self.user, name='Accounts', query_text='SELECT Id FROM Account')
+        sosl = SavedQuery.objects.create(
+            user=self.user, name='Acme', query_text='FIND {Acme}', query_type='sosl',
+        )
+
+        soql_response = self.client.get(reverse('query:load_saved_query', args=[soql.id]))
+        sosl_response = self.client.get(reverse('query:load_saved_query', args=[sosl.id]))
+
+        self.assertRedirects(soql_response, f'/query/?q={soql.id}', fetch_redirect_response=False)
+        self.assertRedirects(sosl_response, f'/query/search/?q={sosl.id}', fetch_redirect_response=False)
+
+    def test_delete_removes_only_own_query(self):
+        mine = SavedQuery.objects.create(user=self.user, name='Mine', query_text='SELECT Id FROM Account')
+        other_user = get_user_model().objects.create_user(username='other', password='password123')
+        theirs = SavedQuery.objects.create(user=other_user, name='Theirs', query_text='SELECT Id FROM Account')
+
+        response = self.client.post(reverse('query:delete_saved_query', args=[mine.id]))
+        missing = self.client.post(reverse('query:delete_saved_query', args=[theirs.id]))
+
+        self.assertRedirects(response, reverse('query:saved_queries'), fetch_redirect_response=False)
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(list(SavedQuery.objects.values_list('name', flat=True)), ['Theirs'])
+
+
+class PrewarmDescribeTaskTests(SalesforceSessionTestCase):
+    @patch('query.tasks.SalesforceClient')
+    def test_prewarm_populates_describe_cache(self, mock_client_cls):
+        mock_sf = MagicMock()
+        mock_sf.connection = self.connection
+        mock_sf.describe_global.return_value = {
+            'sobjects': [{'name': 'Account', 'label': 'Account', 'queryable': True}],
+        }
+        mock_sf.composite.return_value = {'Account': {'fields': [{'name': 'Id', 'label': 'ID'}]}}
+        mock_client_cls.return_value = mock_sf
+
+        prewarm_describe.run(self.connection.id)
+
+        self.assertEqual(cache.get(objects_cache_key(self.connection))[0]['name'], 'Account')
+        self.assertEqual(cache.get(fields_cache_key(self.connection, 'Account'))['fields'][0]['name'], 'Id')
+        mock_sf.composite.assert_called_once_with(
+            [{'method': 'GET', 'url': 'sobjects/Account/describe', 'referenceId': 'Account'}],
+            raise_on_error=False,
+        )
+        mock_sf.describe_sobject.assert_not_called()
+
+    def test_prime_field_payloads_batches_and_keeps_successful_describes(self):
+        names = [f'Obj{i}__c' for i in range(30)]
+        client = MagicMock(connection=self.connection)
+        # Every object but the first describes successfully
+        client.composite.side_effect = lambda subrequests, **kwargs: {
+            sub['referenceId']: {'fields': []} for sub in subrequests if sub['referenceId'] != 'Obj0__c'
+        }
+
+        failed = prime_field_payloads(client, names)
+
+        self.assertEqual(failed, ['Obj0__c'])
+        self.assertEqual([len(call.args[0]) for call in client.composite.call_args_list], [25, 5])
+        self.assertIsNone(cache.get(fields_cache_key(self.connection, 'Obj0__c')))
+        self.assertEqual(cache.get(fields_cache_key(self.connection, 'Obj29__c'))['fields'], [])
+
+    @patch('query.tasks.SalesforceClient')
+    def test_prewarm_skips_retired_scope(self, mock_client_cls):
+        prewarm_describe.run(self.connection.id, 'retired-scope')
+
+        mock_client_cls.assert_not_called()
+
+    @override_settings(USE_CELERY=True)
+    @patch('query.signals.describe_scope', side_effect=['scope-a', 'scope-a', 'scope-b'])
+    @patch('query.tasks.prewarm_describe.apply_async')
+    def test_each_saved_scope_enqueues_one_prewarm(self, mock_apply_async, mock_scope):
+        self.connection.set_access_token('TOKEN')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.connection.save()
+
+        self.assertEqual(
+            [call.args for call in mock_apply_async.call_args_list],
+            [((self.connection.id, 'scope-a'), {}), ((self.connection.id, 'scope-b'), {})],
+        )
+        self.assertEqual(mock_apply_async.call_args.kwargs, {'retry': False})
+
+    @patch('query.tasks.prewarm_describe.apply_async')
+    def test_saves_do_not_touch_a_disabled_broker(self, mock_apply_async):
+        self.connection.set_access_token('TOKEN')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.connection.save()
+
+        # Neither the debounce lock nor a commit hook is spent on a no-op enqueue
+        self.assertEqual(callbacks, [])
+        self.assertIsNone(cache.get(f'sf_prewarm_lock:{describe_scope(self.connection)}'))
+        mock_apply_async.assert_not_called()
+
+
+class QueryMoreStreamTests(SalesforceSessionTestCase):
+    @patch('query.views.SalesforceClient')
+    def test_streams_flattened_records_as_ndjson(self, mock_client_cls):
+        mock_sf = MagicMock()
+        mock_sf.query_more.return_value = {
+            'done': False,
+            'nextRecordsUrl': '/services/data/v62.0/query/01g-4000',
+            'records': [
+                {'attributes': {'type': 'Contact'}, 'Id': '003000000000001AAA', 'Account': {'Name': 'Acme'}},
+                {'attributes': {'type': 'Contact'}, 'Id': '003000000000002AAA', 'Account': None},
+            ],
+        }
+        mock_client_cls.return_value = mock_sf
+
+        response = self.client.get(
+            reverse('query:query_more_stream'),
+            {'nextRecordsUrl': '/services/data/v62.0/query/01g-2000'},
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['X-Records-Done'], 'false')
+        self.assertEqual(response['X-Next-Records-Url'], '/services/data/v62.0/query/01g-4000')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['Account.Name'], 'Acme')
+        self.assertIsNone(json.loads(lines[1])['Account'])
+
+
+class ExportResultsViewTests(SalesforceSessionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.history = QueryHistory.objects.create(
+            connection=self.connection,
+            query_text='SELECT Id, Name, Owner.Name FROM Account',
+            query_type='soql',
+            status='success',
+        )
+
+    @patch('query.views.SalesforceClient')
+    def test_csv_export_flattens_and_formats_cells(self, mock_client_cls):
+        mock_sf = MagicMock()
+        mock_sf.query.return_value = {
+            'totalSize': 2,
+            'done': True,
+            'records': [
+                {
+                    'attributes': {'type': 'Account'},
+                    'Id': '001000000000001AAA',
+                    'Name': 'Acme',
+                    'Owner': {'attributes': {'type': 'User'}, 'Name': 'Alice'},
+                },
+                {
+                    'attributes': {'type': 'Account'},
+                    'Id': '001000000000002AAA',
+                    'Name': None,
+                    'Owner': None,
+                },
+            ],
+        }
+        mock_client_cls.return_value = mock_sf
+
+        response = self.client.get(reverse('query:export', args=[self.history.id]), {'format': 'csv'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'Id,Name,Owner.Name')
+        self.assertEqual(lines[1], '001000000000001AAA,Acme,Alice')
+        self.assertEqual(lines[2], '001000000000002AAA,,')
+
+    @patch('query.views.SalesforceClient')
+    def test_csv_export_reads_lookups_and_subqueries_from_raw_records(self, mock_client_cls):
+        self.history.query_text = 'SELECT Id, Owner.Name, (SELECT Id FROM Contacts) FROM Account'
+        self.history.save()
+        children = [OrderedDict([('Id', '003000000000001AAA')])]
+        mock_client_cls.return_value.query.return_value = OrderedDict([
+            ('done', True),
+            ('records', [
+                OrderedDict([
+                    ('attributes', OrderedDict([('type', 'Account')])),
+                    ('Id', '001000000000001AAA'),
+                    ('Owner', OrderedDict([('Name', 'Alice')])),
+                    ('Contacts', OrderedDict([('done', True), ('records', children)])),
+                ]),
+                OrderedDict([('Id', '001000000000002AAA'), ('Owner', None), ('Contacts', None)]),
+            ]),
+        ])
+
+        response = self.client.get(reverse('query:export', args=[self.history.id]), {'format': 'csv'})
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines, [
+            'Id,Owner.Name,Contacts',
+            '001000000000001AAA,Alice,"[{""Id"": ""003000000000001AAA""}]"',
+            '001000000000002AAA,,',
+        ])
+
+    @patch('query.views.SalesforceClient')
+    def test_csv_export_follows_next_records_url(self, mock_client_cls):
+        mock_sf = MagicMock()
+        mock_sf.query.return_value = {
+            'done': False,
+            'nextRecordsUrl': '/services/data/v62.0/query/01g-2000',
+            'records': [{'attributes': {'type': 'Account'}, 'Id': '001000000000001AAA', 'Name': 'Acme'}],
+        }
+        mock_sf.query_more.return_value = {
+            'done': True,
+            'records': [{'attributes': {'type': 'Account'}, 'Id': '001000000000002AAA', 'Name': 'Globex'}],
+        }
+        mock_client_cls.return_value = mock_sf
+
+        response = self.client.get(reverse('query:export', args=[self.history.id]), {'format': 'csv'})
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[1:], ['001000000000001AAA,Acme,', '001000000000002AAA,Globex,'])
+        mock_sf.query_more.assert_called_once_with('/services/data/v62.0/query/01g-2000')
+
+    @patch('query.views.SalesforceClient')
+    def test_json_export_strips_attributes(self, mock_client_cls):
+        mock_client_cls.return_value.query.return_value = {
+            'done': True,
+            'records': [OrderedDict([('attributes', {'type': 'Account'}), ('Id', '001000000000001AAA')])],
+        }
+
+        response = self.client.get(reverse('query:export', args=[self.history.id]), {'format': 'json'})
+
+        data = json.loads(response.content)
+        self.assertEqual(data['record_count'], 1)
+        self.assertEqual(data['records'], [{'Id': '001000000000001AAA'}])
+        self.assertEqual(data['query'], self.history.query_text)
+
+    @patch('query.views.SalesforceClient')
+    def test_export_reuses_results_cached_by_query_view(self, mock_client_cls):
+        mock_sf = MagicMock()
+        mock_sf.query.return_value = {
+            'totalSize': 1,
+            'done': True,
+            'records': [{'attributes': {'type': 'Account'}, 'Id': '001000000000001AAA', 'Name': 'Acme'}],
+        }
+        mock_client_cls.return_value = mock_sf
+
+        self.client.post(reverse('query:index'), {'query': 'SELECT Id, Name FROM Account'})
+        history = QueryHistory.objects.latest('executed_at')
+        response = self.client.get(reverse('query:export', args=[history.id]), {'format': 'csv'})
+
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines, ['Id,Name', '001000000000001AAA,Acme'])
+        mock_sf.query.assert_called_once()
+
+
+class RecordDetailViewTests(SalesforceSessionTestCase):
+    def _mock_client(self, mock_client_cls):
+        mock_sf = MagicMock()
+        mock_sf.connection = self.connection
+        mock_sf.describe_global.return_value = {
+            'sobjects': [{'name': 'Account', 'label': 'Account', 'queryable': True}],
+        }
+        mock_client_cls.return_value = mock_sf
+        return mock_sf
+
+    @patch('query.views.SalesforceClient')
+    def test_renders_fields_with_values(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+        mock_sf.composite.return_value = {
+            'describe': {
+                'fields': [
+                    {'name': 'Name', 'label': 'Account Name', 'type': 'string', 'updateable': True},
+                    {'name': 'Id', 'label': 'Account ID', 'type': 'id'},
+                ],
+            },
+            'record': {
+                'records': [{'attributes': {'type': 'Account'}, 'Id': '001000000000001AAA', 'Name': 'Acme'}],
+            },
+        }
+
+        response = self.client.get(reverse('query:record_detail', args=['Account', '001000000000001AAA']))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f.name for f in response.context['fields']], ['Id', 'Name'])
+        self.assertEqual(response.context['fields'][1].value, 'Acme')
+        self.assertContains(response, 'Acme')
+        subrequests = mock_sf.composite.call_args.args[0]
+        self.assertEqual(
+            [sub['url'] for sub in subrequests],
+            [
+                'sobjects/Account/describe',
+                'query/?q=SELECT%20FIELDS%28ALL%29%20FROM%20Account%20WHERE%20Id%20%3D%20%27001000000000001AAA%27%20LIMIT%201',
+            ],
+        )
+
+    @patch('query.views.SalesforceClient')
+    def test_cached_describe_fetches_only_the_record(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+        mock_sf.composite.return_value = {
+            'describe': {'fields': [{'name': 'Name', 'label': 'Account Name', 'type': 'string'}]},
+            'record': {'records': [{'Id': '001000000000001AAA', 'Name': 'Acme'}]},
+        }
+        mock_sf.query.return_value = {'records': [{'Id': '001000000000002AAA', 'Name': 'Globex'}]}
+
+        self.client.get(reverse('query:record_detail', args=['Account', '001000000000001AAA']))
+        response = self.client.get(reverse('query:record_detail', args=['Account', '001000000000002AAA']))
+
+        self.assertContains(response, 'Globex')
+        mock_sf.composite.assert_called_once()
+        mock_sf.query.assert_called_once_with(
+            "SELECT FIELDS(ALL) FROM Account WHERE Id = '001000000000002AAA' LIMIT 1"
+        )
+
+    @patch('query.views.SalesforceClient')
+    def test_lowercase_object_name_shares_the_canonical_cache_entry(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+        mock_sf.composite.return_value = {
+            'describe': {'fields': [{'name': 'Name', 'label': 'Account Name', 'type': 'string'}]},
+            'record': {'records': [{'Id': '001000000000001AAA', 'Name': 'Acme'}]},
+        }
+        mock_sf.query.return_value = {'records': [{'Id': '001000000000001AAA', 'Name': 'Acme'}]}
+
+        lower = self.client.get(reverse('query:record_detail', args=['account', '001000000000001AAA']))
+        canonical = self.client.get(reverse('query:record_detail', args=['Account', '001000000000001AAA']))
+
+        self.assertEqual(lower.status_code, 200)
+        self.assertEqual(lower.context['object_type'], 'Account')
+        self.assertContains(canonical, 'Acme')
+        self.assertEqual(mock_sf.composite.call_args.args[0][0]['url'], 'sobjects/Account/describe')
+        mock_sf.composite.assert_called_once()
+        mock_sf.query.assert_called_once_with(
+            "SELECT FIELDS(ALL) FROM Account WHERE Id = '001000000000001AAA' LIMIT 1"
+        )
+
+    @patch('query.views.SalesforceClient')
+    def test_projects_requested_fields(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+        mock_sf.composite.return_value = {
+            'describe': {
+                'fields': [
+                    {'name': 'Id', 'label': 'Account ID', 'type': 'id'},
+                    {'name': 'Name', 'label': 'Account Name', 'type': 'string'},
+                    {'name': 'Industry', 'label': 'Industry', 'type': 'picklist'},
+                ],
+            },
+            'record': {'records': [{'Id': '001000000000001AAA', 'Name': 'Acme'}]},
+        }
+
+        response = self.client.get(
+            reverse('query:record_detail', args=['Account', '001000000000001AAA']),
+            {'fields': 'Name'},
+        )
+
+        self.assertEqual([f.name for f in response.context['fields']], ['Id', 'Name'])
+        record_url = mock_sf.composite.call_args.args[0][1]['url']
+        self.assertIn('SELECT%20Id%2C%20Name%20FROM%20Account', record_url)
+
+    @patch('query.views.SalesforceClient')
+    def test_rejects_invalid_field_names(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+
+        response = self.client.get(
+            reverse('query:record_detail', args=['Account', '001000000000001AAA']),
+            {'fields': "Name FROM User WHERE Name != ''"},
+        )
+
+        self.assertRedirects(response, reverse('query:index'), fetch_redirect_response=False)
+        mock_sf.composite.assert_not_called()
+
+    @patch('query.views.SalesforceClient')
+    def test_rejects_malformed_record_id(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+
+        response = self.client.get(reverse('query:record_detail', args=['Account', "x' OR Name != '"]))
+
+        self.assertRedirects(response, reverse('query:index'), fetch_redirect_response=False)
+        mock_sf.composite.assert_not_called()
+
+    @patch('query.views.SalesforceClient')
+    def test_rejects_unknown_object_type(self, mock_client_cls):
+        mock_sf = self._mock_client(mock_client_cls)
+
+        response = self.client.get(reverse('query:record_detail', args=['NotAnObject', '001000000000001AAA']))
+
+        self.assertRedirects(response, reverse('query:index'), fetch_redirect_response=False)
+        mock_sf.composite.assert_not_called()
+
+
+class UpdateRecordViewTests(SalesforceSessionTestCase):
+    @patch('query.views.SalesforceClient')
+    def test_posts_field_values_with_blanks_as_null(self, mock_client_cls):
+        response = self.client.post(
+            reverse('query:update_record', args=['Account', '001000000000001AAA']),
+            {'object_type': 'Account', 'record_id': '001000000000001AAA', 'Name': 'Acme', 'Industry': ''},
+        )
+
+        self.assertEqual(response.json(), {'success': True})
+        mock_client_cls.return_value.update_record.assert_called_once_with(
+            'Account', '001000000000001AAA', {'Name': 'Acme', 'Industry': None},
+        )
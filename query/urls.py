@@ -7,6 +7,7 @@ urlpatterns = [
     path('', views.QueryIndexView.as_view(), name='index'),
     path('search/', views.SearchView.as_view(), name='search'),
     path('more/', views.query_more, name='query_more'),
+    path('more/stream/', views.query_more_stream, name='query_more_stream'),
     path('explain/', views.explain_query_view, name='explain_query'),
     path('export/<int:history_id>/', views.ExportResultsView.as_view(), name='export'),
     path('saved/', views.SavedQueryView.as_view(), name='saved_queries'),
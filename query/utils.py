@@ -0,0 +1,284 @@
+"""
+Shared helpers for the query views and background tasks: task dispatch, fast JSON
+responses, cached Salesforce describe data and count-free pagination.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from operator import attrgetter, itemgetter
+from typing import Any
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import HttpResponse
+
+logger = logging.getLogger('workbench')
+
+# Describe metadata changes rarely, so object/field listings are cached for an hour.
+DESCRIBE_CACHE_TIMEOUT = 60 * 60
+
+# The Composite API accepts at most 25 subrequests per call.
+COMPOSITE_MAX_SUBREQUESTS = 25
+
+
+def enqueue_task(task_name, *args, **kwargs):
+    """
+    Send one of the query app's Celery tasks without waiting on the broker. Returns
+    False when Celery is disabled or the broker refuses the message, so the caller
+    can do the work inline or skip it.
+    """
+    if not settings.USE_CELERY:
+        return False
+    try:
+        from . import tasks
+
+        # retry=False fails fast instead of retrying the broker connection on the request path
+        getattr(tasks, task_name).apply_async(args, kwargs, retry=False)
+    except Exception as exc:
+        logger.warning("Could not enqueue %s: %s", task_name, exc)
+        return False
+    return True
+
+
+class OrjsonResponse(HttpResponse):
+    """
+    JSON response serialized with orjson, which is considerably faster than the
+    stdlib encoder used by JsonResponse for large record and describe payloads.
+    """
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=orjson.dumps(data), **kwargs)
+
+
+def describe_scope(connection):
+    """
+    Cache namespace for a connection's describe data. Logging in again, refreshing
+    the token or logging out saves the connection, which bumps updated_at and so
+    retires everything cached for the previous login without an explicit delete.
+    """
+    return f"{connection.id}:{int(connection.updated_at.timestamp())}"
+
+
+def objects_cache_key(connection):
+    return f"sf_objects:{describe_scope(connection)}"
+
+
+def object_names_cache_key(connection):
+    return f"sf_object_name_map:{describe_scope(connection)}"
+
+
+def fields_cache_key(connection, object_name):
+    return f"sf_fields:{describe_scope(connection)}:{object_name}"
+
+
+def record_fields_cache_key(connection, object_name):
+    return f"sf_record_field_views:{describe_scope(connection)}:{object_name}"
+
+
+# Rendered query index pages are reused for a short while per session.
+INDEX_PAGE_CACHE_TIMEOUT = 30
+
+
+def index_page_revision_key(user_id):
+    return f"query_index_rev:{user_id}"
+
+
+def invalidate_index_page(user_id):
+    """
+    Retire the user's cached query index pages once the current transaction commits.
+    Call it after the history or saved-query write: bumping the revision first would
+    let a page rendered before the write be cached under the new revision.
+    """
+    # Outlives every page cached under the previous revision
+    transaction.on_commit(
+        lambda: cache.set(index_page_revision_key(user_id), time.time_ns(), INDEX_PAGE_CACHE_TIMEOUT * 2)
+    )
+
+
+@dataclass(slots=True)
+class RecordField:
+    """One field on the record detail page; ``value`` is filled in per record."""
+
+    label: str
+    name: str
+    type: str
+    updateable: bool
+    createable: bool
+    length: Any
+    precision: Any
+    scale: Any
+    referenceTo: Any
+    picklistValues: list
+    nillable: bool
+    calculated: bool
+    custom: bool
+    value: Any = None
+
+
+def build_record_field_meta(describe_result):
+    """Project a describe_sobject result onto the field metadata the record detail page renders."""
+    fields = [
+        RecordField(
+            label=field.get('label'),
+            name=field.get('name'),
+            type=field.get('type'),
+            updateable=field.get('updateable', False),
+            createable=field.get('createable', False),
+            length=field.get('length'),
+            precision=field.get('precision'),
+            scale=field.get('scale'),
+            referenceTo=field.get('referenceTo'),
+            picklistValues=field.get('picklistValues', []),
+            nillable=field.get('nillable', False),
+            calculated=field.get('calculated', False),
+            custom=field.get('custom', False),
+        )
+        for field in describe_result.get('fields', ())
+    ]
+
+    # Sort fields by creation order (system fields first, then custom)
+    fields.sort(key=attrgetter('custom', 'name'))
+    return fields
+
+
+def build_object_list(describe_result):
+    """Project a describe_global result onto the queryable objects, sorted by label."""
+    objects = []
+    for sobject in describe_result.get('sobjects', []):
+        # Only include queryable objects
+        if sobject.get('queryable'):
+            objects.append({
+                'name': sobject.get('name'),
+                'label': sobject.get('label'),
+                'custom': sobject.get('custom', False),
+                'keyPrefix': sobject.get('keyPrefix', ''),
+            })
+
+    # Sort objects by label once, at cache-population time
+    objects.sort(key=itemgetter('label'))
+    return objects
+
+
+def build_field_payload(describe_result):
+    """Project a describe_sobject result onto the fields used by the query builder."""
+    fields = [
+        {
+            'name': field.get('name'),
+            'label': field.get('label'),
+            'type': field.get('type'),
+            'length': field.get('length'),
+            'relationshipName': field.get('relationshipName'),
+            'referenceTo': field.get('referenceTo'),
+            'custom': field.get('custom', False),
+            'filterable': field.get('filterable', False),
+            'sortable': field.get('sortable', False),
+            'groupable': field.get('groupable', False),
+            'createable': field.get('createable', False),
+            'updateable': field.get('updateable', False),
+            'nillable': field.get('nillable', False),
+        }
+        for field in describe_result.get('fields', ())
+    ]
+
+    # Sort fields by label once, at cache-population time
+    fields.sort(key=itemgetter('label'))
+
+    return {
+        'fields': fields,
+        'childRelationships': describe_result.get('childRelationships', []),
+        'recordTypeInfos': describe_result.get('recordTypeInfos', []),
+    }
+
+
+def get_object_list(client, refresh=False):
+    """Return the queryable object list for the client's connection, cached per connection."""
+    key = objects_cache_key(client.connection)
+    objects = None if refresh else cache.get(key)
+    if objects is None:
+        objects = build_object_list(client.describe_global())
+        cache.set(key, objects, DESCRIBE_CACHE_TIMEOUT)
+    return objects
+
+
+def get_object_names(client):
+    """
+    Return the queryable object names keyed by their lowercase form, for
+    case-insensitive lookups: Salesforce treats ``account`` and ``Account`` alike.
+    """
+    key = object_names_cache_key(client.connection)
+    names = cache.get(key)
+    if names is None:
+        names = {obj['name'].lower(): obj['name'] for obj in get_object_list(client)}
+        cache.set(key, names, DESCRIBE_CACHE_TIMEOUT)
+    return names
+
+
+def get_field_payload(client, object_name, refresh=False):
+    """Return the field payload for ``object_name``, cached per connection."""
+    key = fields_cache_key(client.connection, object_name)
+    payload = None if refresh else cache.get(key)
+    if payload is None:
+        payload = build_field_payload(client.describe_sobject(object_name))
+        cache.set(key, payload, DESCRIBE_CACHE_TIMEOUT)
+    return payload
+
+
+def prime_field_payloads(client, object_names):
+    """
+    Describe several objects through the Composite API, up to 25 per round-trip,
+    and cache each field payload that came back. Objects whose describe failed are
+    left for the views to describe on demand; their names are returned.
+    """
+    object_names = list(object_names)
+    failed = []
+    for start in range(0, len(object_names), COMPOSITE_MAX_SUBREQUESTS):
+        batch = object_names[start:start + COMPOSITE_MAX_SUBREQUESTS]
+        results = client.composite(
+            [
+                {'method': 'GET', 'url': f'sobjects/{object_name}/describe', 'referenceId': object_name}
+                for object_name in batch
+            ],
+            raise_on_error=False,
+        )
+        cache.set_many(
+            {
+                fields_cache_key(client.connection, object_name): build_field_payload(describe_result)
+                for object_name, describe_result in results.items()
+            },
+            DESCRIBE_CACHE_TIMEOUT,
+        )
+        failed.extend(object_name for object_name in batch if object_name not in results)
+    return failed
+
+
+class LookaheadPaginator(Paginator):
+    """
+    Paginator that never issues COUNT(*). Each page fetches one row more than it
+    shows to learn whether another page follows, so ``count`` and ``num_pages``
+    only reach as far as the next page. Out-of-range page numbers fall back to the
+    first page, since the last page is unknown.
+    """
+
+    def get_page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            return self.get_page(1)
+
+        # Known lower bound; overrides the cached_property that would run COUNT(*)
+        self.count = bottom + len(rows)
+        # num_pages is a cached_property derived from count; drop any earlier page's value
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    page = get_page
@@ -1,126 +1,457 @@
 from collections import OrderedDict
+from functools import lru_cache, wraps
+from itertools import chain
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.views import View
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.vary import vary_on_cookie
+from django.middleware.gzip import re_accepts_gzip
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.utils import timezone
-from django.views.decorators.cache import cache_page
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
+from django.utils.text import compress_string
 from django.urls import reverse
+import hashlib
 import json
+import re
 import time
 import csv
-import io
+import gzip
 import logging
+import zlib
+from urllib.parse import quote
+
+import orjson
 
 from authentication.salesforce_client import SalesforceClient, SalesforceAPIError
-from authentication.models import SalesforceConnection
 from .models import SavedQuery, QueryHistory
 from .forms import QueryForm, SavedQueryForm, SearchForm
+from .utils import (
+    DESCRIBE_CACHE_TIMEOUT, INDEX_PAGE_CACHE_TIMEOUT, LookaheadPaginator, OrjsonResponse, build_record_field_meta,
+    describe_scope, enqueue_task, get_field_payload, get_object_list, get_object_names, index_page_revision_key,
+    invalidate_index_page, record_fields_cache_key,
+)
 
 logger = logging.getLogger('workbench')
 
-def flatten_record(record, separator='.'):
+# Salesforce record IDs are 15 (case-sensitive) or 18 (case-insensitive) alphanumerics.
+_RECORD_ID_RE = re.compile(r'^[a-zA-Z0-9]{15,18}$')
+# API names of fields (including custom __c fields) that may be projected into SOQL.
+_FIELD_NAME_RE = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+# Form keys posted by the record detail page that are not Salesforce fields.
+_UPDATE_EXCLUDED_KEYS = frozenset(('csrfmiddlewaretoken', 'object_type', 'record_id'))
+
+# SOQL clause parsing shared by the query view and CSV export.
+_FROM_RE = re.compile(r'FROM\s+(\w+)', re.IGNORECASE)
+_SELECT_RE = re.compile(r'^\s*SELECT\s+', re.IGNORECASE)
+# The only tokens that matter when splitting a SELECT list: parens, commas, string literals and FROM.
+_SELECT_TOKEN_RE = re.compile(r"[(),]|'(?:[^'\\]|\\.)*'|\bFROM\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def _parse_soql_columns(query_text):
+    """
+    Return the result column names requested by a SOQL SELECT list, in order.
+
+    Items are split on top-level commas in one scan, so function arguments and
+    child subqueries keep their commas. A subquery is named by its relationship
+    and "expr alias" by its alias.
+    """
+    select_match = _SELECT_RE.match(query_text)
+    if not select_match:
+        return ()
+
+    items = []
+    depth = 0
+    start = select_match.end()
+    for token in _SELECT_TOKEN_RE.finditer(query_text, start):
+        text = token.group()
+        if text == '(':
+            depth += 1
+        elif text == ')':
+            depth -= 1
+        elif depth == 0 and text == ',':
+            items.append(query_text[start:token.start()])
+            start = token.end()
+        elif depth == 0 and text.upper() == 'FROM':
+            items.append(query_text[start:token.start()])
+            break
+    else:
+        # No top-level FROM clause
+        return ()
+
+    columns = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith('('):
+            # Child subquery: rows carry it under the relationship name
+            match = _FROM_RE.search(item)
+            if match:
+                columns.append(match.group(1))
+            continue
+        # Remove potential aliases like "COUNT(Id) total" -> "total" (simplified)
+        parts = item.rsplit(None, 1)
+        if len(parts) > 1 and parts[1].upper() != 'AS' and '(' not in parts[1] and ')' not in parts[1]:
+            columns.append(parts[1])
+        else:
+            columns.append(item)
+    return tuple(columns)
+
+
+# Results a user has just viewed are kept briefly so exporting them doesn't query Salesforce again.
+QUERY_RESULT_CACHE_TIMEOUT = 15 * 60
+
+
+def _query_records_key(history_id):
+    return f"qhist_records:{history_id}"
+
+
+def _cache_query_records(history_id, records):
+    cache.set(_query_records_key(history_id), zlib.compress(orjson.dumps(records)), QUERY_RESULT_CACHE_TIMEOUT)
+
+
+def _cached_query_records(history_id):
+    payload = cache.get(_query_records_key(history_id))
+    if payload is None:
+        return None
+    return orjson.loads(zlib.decompress(payload))
+
+
+def _iter_query_records(client, result):
+    """Yield every record of a SOQL result, following nextRecordsUrl one batch at a time."""
+    while True:
+        yield from result.get('records', ())
+        next_url = result.get('nextRecordsUrl')
+        if result.get('done', True) or not next_url:
+            return
+        result = client.query_more(next_url)
+
+
+def _wants_refresh(request):
+    """True when the caller asked to bypass the describe caches (``?refresh=1``)."""
+    return request.GET.get('refresh') in ('1', 'true')
+
+
+# Slice size limits for ?page= requests on the describe endpoints.
+DESCRIBE_PAGE_SIZE = 200
+DESCRIBE_MAX_PAGE_SIZE = 500
+
+
+def _describe_page(request):
     """
-    Recursively flatten a Salesforce record dictionary.
+    Return ``(page, size)`` when the caller asked for one slice of a describe list
+    (``?page=N&size=M``, zero-based), or None for the whole list.
+    """
+    if 'page' not in request.GET:
+        return None
+    try:
+        page = max(int(request.GET['page']), 0)
+    except ValueError:
+        page = 0
+    try:
+        size = int(request.GET.get('size', DESCRIBE_PAGE_SIZE))
+    except ValueError:
+        size = DESCRIBE_PAGE_SIZE
+    return page, min(max(size, 1), DESCRIBE_MAX_PAGE_SIZE)
+
+
+def _paginate_list(items, page, size):
+    """Slice one page out of an already sorted list, with paging hints for the client."""
+    start = page * size
+    end = start + size
+    return items[start:end], {
+        'page': page,
+        'has_more': end < len(items),
+        'next_page': page + 1 if end < len(items) else None,
+        'total': len(items),
+    }
+
+
+def _objects_body_key(connection):
+    return f"sf_objects_json_gz:{describe_scope(connection)}"
+
+
+def _fields_body_key(connection, object_name):
+    return f"sf_fields_json_gz:{describe_scope(connection)}:{object_name}"
+
+
+def _objects_etag_key(connection):
+    return f"etag:objects:{describe_scope(connection)}"
+
+
+def _fields_etag_key(connection, object_name):
+    return f"etag:fields:{describe_scope(connection)}:{object_name}"
+
+
+def require_sf_connection(view):
+    """
+    Resolve request.sf_connection once and pass it to the view as ``connection``,
+    answering 401 when the user has no usable Salesforce connection.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        # The middleware resolves the session or most recent user connection lazily.
+        connection = getattr(request, 'sf_connection', None)
+        if not connection:
+            return OrjsonResponse({
+                'success': False,
+                'error': '有効な Salesforce 接続が見つかりません。Salesforce にログインしてください。'
+            }, status=401)
+        return view(request, *args, connection=connection, **kwargs)
+
+    return wrapper
+
+
+def _objects_etag(request):
+    connection = getattr(request, 'sf_connection', None)
+    # The stored ETag describes the whole list, not a page of it
+    if not connection or _wants_refresh(request) or 'page' in request.GET:
+        return None
+    return cache.get(_objects_etag_key(connection))
+
+
+def _fields_etag(request):
+    connection = getattr(request, 'sf_connection', None)
+    object_name = request.GET.get('object')
+    if not connection or not object_name or _wants_refresh(request) or 'page' in request.GET:
+        return None
+    return cache.get(_fields_etag_key(connection, object_name))
+
+
+def _set_response_etag(response, etag_key):
+    """Hash the response body and remember the ETag for conditional requests."""
+    etag = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+    cache.set(etag_key, etag, DESCRIBE_CACHE_TIMEOUT)
+    response['ETag'] = quote_etag(etag)
+    return response
+
+
+def _cache_body(body_key, response):
+    """Store a describe response body gzipped, ready to be served as is."""
+    cache.set(body_key, compress_string(response.content), DESCRIBE_CACHE_TIMEOUT)
+
+
+def _cached_body_response(request, body_key, etag_key):
+    """
+    Return the cached JSON body with its stored ETag, or None on a miss. Bodies are
+    kept gzipped, so clients that accept gzip get them without recompression; the
+    body is only hashed again if its ETag entry has gone missing.
+    """
+    cached = cache.get_many([body_key, etag_key])
+    compressed = cached.get(body_key)
+    if compressed is None:
+        return None
+    etag = cached.get(etag_key)
+    if etag is None:
+        response = HttpResponse(gzip.decompress(compressed), content_type='application/json')
+        return _set_response_etag(response, etag_key)
+
+    if re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response = HttpResponse(compressed, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+        # Weak, as GZipMiddleware makes it for bodies it compresses itself
+        response['ETag'] = 'W/' + quote_etag(etag)
+    else:
+        response = HttpResponse(gzip.decompress(compressed), content_type='application/json')
+        response['ETag'] = quote_etag(etag)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _record_history_later(connection, **fields):
+    """
+    Write a QueryHistory row once the current transaction commits, via Celery when it
+    is enabled and inline otherwise.
+    """
+    connection_id, user_id = connection.id, connection.user_id
+
+    def write():
+        # The task retires the cached index pages itself once the row exists
+        if not enqueue_task('record_query_history', connection_id, user_id, **fields):
+            QueryHistory.objects.create(connection_id=connection_id, **fields)
+            invalidate_index_page(user_id)
+
+    transaction.on_commit(write)
+
+
+# Exact types treated as nested objects. simple-salesforce parses responses into
+# OrderedDicts; cached and composite results are plain dicts.
+_MAPPING_TYPES = frozenset((dict, OrderedDict))
+
+
+def flatten_record(record, separator='.', columns=None, seen=None):
+    """
+    Flatten a Salesforce record dictionary.
     Example: {'Name': 'A', 'Parent': {'Name': 'B'}} -> {'Name': 'A', 'Parent.Name': 'B'}
+    Child subquery results are kept whole as their list of records.
+
+    When ``columns`` and ``seen`` are given, keys not yet in ``seen`` are appended
+    to ``columns`` as they are produced, so callers building a table header do not
+    need a second pass over the flattened records.
     """
-    flat_record = OrderedDict()
-    
-    def recurse(data, prefix=''):
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if key == 'attributes':
-                    continue
-                
-                new_key = f"{prefix}{key}" if prefix else key
-                
-                if isinstance(value, dict):
-                    # Recurse into nested object
-                    recurse(value, f"{new_key}{separator}")
+    track_columns = columns is not None
+    if type(record) not in _MAPPING_TYPES:
+        # Should not happen for a record, but handle gracefully
+        return {'': record}
+
+    # Fast path: rows without lookups or subqueries (e.g. SELECT Id, Name FROM Account)
+    # only need attributes dropped, which a C-level copy and type scan can do.
+    flat_record = dict(record)
+    flat_record.pop('attributes', None)
+    if _MAPPING_TYPES.isdisjoint(map(type, flat_record.values())):
+        if track_columns and not flat_record.keys() <= seen:
+            for key in flat_record:
+                if key not in seen:
+                    seen.add(key)
+                    columns.append(key)
+        return flat_record
+
+    flat_record = {}
+
+    # Walk parent lookups with an explicit stack of item iterators so keys keep
+    # their depth-first order without a Python call per nesting level.
+    stack = [(iter(record.items()), '')]
+    while stack:
+        items, prefix = stack[-1]
+        for key, value in items:
+            if key == 'attributes':
+                continue
+
+            new_key = prefix + key if prefix else key
+
+            if type(value) in _MAPPING_TYPES:
+                if 'records' in value and 'done' in value:
+                    # Child relationship subquery
+                    value = value['records']
                 else:
-                    flat_record[new_key] = value
+                    # Descend into nested object, resuming this level afterwards
+                    stack.append((iter(value.items()), new_key + separator))
+                    break
+
+            flat_record[new_key] = value
+            if track_columns and new_key not in seen:
+                seen.add(new_key)
+                columns.append(new_key)
         else:
-            # Should not happen for a record, but handle gracefully
-            flat_record[prefix] = data
+            stack.pop()
 
-    recurse(record)
     return flat_record
 
 
+def _csv_text(value):
+    return '' if value is None else str(value)
+
+
+def _csv_json(value):
+    return '' if value is None else json.dumps(value)
+
+
+def _csv_any(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return _csv_text(value)
+
+
+def _csv_formatter_for(sample):
+    """Choose the CSV cell formatter for a column from a sample value (None: decide per cell)."""
+    if sample is None:
+        return _csv_any
+    if isinstance(sample, (dict, list)):
+        return _csv_json
+    return _csv_text
+
+
+def _column_reader(field, separator='.'):
+    """
+    Return a function reading one flattened column (e.g. ``Owner.Name``) straight
+    from a raw record, with the same result flatten_record would give, so CSV rows
+    are written without building a flattened dict per record.
+    """
+    head, *path = field.split(separator)
+
+    def read(record):
+        value = record.get(head)
+        for key in path:
+            if type(value) not in _MAPPING_TYPES:
+                return None
+            value = value.get(key)
+        if type(value) in _MAPPING_TYPES:
+            # Child subqueries flatten to their records; lookups only to their leaves
+            return value['records'] if 'records' in value and 'done' in value else None
+        return value
+
+    return read
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() returns the formatted line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
 class QueryIndexView(View):
     """
     Main SOQL query interface
     """
     template_name = 'query/index.html'
     
+    @method_decorator(vary_on_cookie)
     def get(self, request):
         """Display query form"""
-        form = QueryForm()
-        
-        # Get recent queries for this user
+        # Flash messages are shown once, so a page carrying them is never reused
+        if messages.get_messages(request) or not request.session.session_key:
+            return self._render_form(request, QueryForm())
+
+        # The page is per session (user, connection, CSRF token) and only changes when
+        # the sidebar data does, so repeated loads reuse the rendered body briefly.
+        # get_token() keeps the CSRF cookie issued on hits too, and keying on its
+        # secret means a rotated cookie never gets a page carrying the old token.
+        get_token(request)
+        csrf_secret = hashlib.blake2b(request.META['CSRF_COOKIE'].encode(), digest_size=8).hexdigest()
+        revision = cache.get(index_page_revision_key(request.user.pk), 0)
+        page_key = f"query_index:{request.session.session_key}:{revision}:{csrf_secret}"
+        content = cache.get(page_key)
+        if content is None:
+            response = self._render_form(request, QueryForm())
+            cache.set(page_key, response.content, INDEX_PAGE_CACHE_TIMEOUT)
+            return response
+        return HttpResponse(content)
+
+    def _render_form(self, request, form):
+        """Render the query page around ``form``, which may be a bound form carrying errors."""
+        # Get recent queries for this user; the sidebar only shows text and timestamp,
+        # so plain rows are fetched instead of model instances
         recent_queries = QueryHistory.objects.filter(
             connection__user=request.user
-        )[:10]
+        ).values('query_text', 'executed_at')[:10]
 
         # Get saved queries
         saved_queries = SavedQuery.objects.filter(
             user=request.user,
             query_type='soql'
-        )[:10]
+        ).values('name', 'query_text')[:10]
 
         # Check if user has active Salesforce connection
-        has_sf_connection = False
-        if hasattr(request, 'sf_connection'):
-            has_sf_connection = True
-        elif request.user.is_authenticated:
-            # Try to find an active connection
-            connection = SalesforceConnection.objects.filter(
-                user=request.user,
-                is_active=True
-            ).first()
-            has_sf_connection = connection is not None
-
-        # Preload Salesforce objects for the selector when a connection is available.
+        has_sf_connection = bool(request.sf_connection)
+
+        # The object selector is populated in the browser from the cached
+        # get_objects endpoint, keeping Salesforce off the page render path.
         available_objects = {
             'standard': [],
             'custom': [],
         }
-        if has_sf_connection:
-            try:
-                connection = getattr(request, 'sf_connection', None)
-                if connection is None and request.user.is_authenticated:
-                    connection = SalesforceConnection.objects.filter(
-                        user=request.user,
-                        is_active=True
-                    ).order_by('-updated_at').first()
-
-                if connection:
-                    client = SalesforceClient(connection)
-                    describe_result = client.describe_global()
-
-                    for sobject in describe_result.get('sobjects', []):
-                        if not sobject.get('queryable'):
-                            continue
-
-                        obj_data = {
-                            'name': sobject.get('name'),
-                            'label': sobject.get('label'),
-                            'custom': sobject.get('custom', False),
-                        }
-
-                        if obj_data['custom']:
-                            available_objects['custom'].append(obj_data)
-                        else:
-                            available_objects['standard'].append(obj_data)
-
-                    available_objects['standard'].sort(key=lambda x: x['label'])
-                    available_objects['custom'].sort(key=lambda x: x['label'])
-            except SalesforceAPIError as exc:
-                logger.warning("Failed to preload Salesforce objects: %s", exc)
 
         context = {
             'form': form,
@@ -128,7 +459,7 @@ class QueryIndexView(View):
             'saved_queries': saved_queries,
             'has_sf_connection': has_sf_connection,
             'available_objects': available_objects,
-            'has_initial_objects': bool(available_objects['standard'] or available_objects['custom']),
+            'has_initial_objects': False,
         }
         return render(request, self.template_name, context)
     
@@ -137,8 +468,8 @@ class QueryIndexView(View):
         form = QueryForm(request.POST)
         if not form.is_valid():
             messages.error(request, '入力内容のエラーを修正してください。')
-            return self.get(request)
-        
+            return self._render_form(request, form)
+
         try:
             client = SalesforceClient(request.sf_connection)
             query_text = form.cleaned_data['query']
@@ -158,7 +489,8 @@ class QueryIndexView(View):
             # Calculate execution time
             execution_time = time.time() - start_time
             
-            # Save to history (save the ORIGINAL formatted text)
+            # Save to history (save the ORIGINAL formatted text). This stays synchronous,
+            # unlike the error path: the export links on the results page need history.id.
             history = QueryHistory.objects.create(
                 connection=request.sf_connection,
                 query_text=query_text,
@@ -169,9 +501,15 @@ class QueryIndexView(View):
                 has_more_results=not result.get('done', True),
                 next_records_url=result.get('nextRecordsUrl', None)
             )
+            invalidate_index_page(request.user.pk)
+            # Keep the raw page for export before the records are flattened for display.
+            # A partial first page would truncate the export, so those are re-queried.
+            if result.get('done', True):
+                _cache_query_records(history.id, result.get('records', []))
             
             # Extract object type from query (for ID links)
             object_type = None
+            all_columns = []
             if result.get('records') and len(result['records']) > 0:
                 # Get object type from attributes if available
                 if 'attributes' in result['records'][0]:
@@ -179,65 +517,36 @@ class QueryIndexView(View):
 
                 # If not, try to parse from query
                 if not object_type:
-                    import re
-                    match = re.search(r'FROM\s+(\w+)', query_text, re.IGNORECASE)
+                    match = _FROM_RE.search(query_text)
                     if match:
                         object_type = match.group(1)
 
-                # --- NEW LOGIC: Deep Flatten for Display ---
+                # --- Generate all unique columns for the header ---
+                seen_columns = set()
+                
+                # 1. Parse fields from SOQL to ensure requested columns are shown even if data is null
+                for col_name in _parse_soql_columns(query_text):
+                    if col_name not in seen_columns:
+                        all_columns.append(col_name)
+                        seen_columns.add(col_name)
+
+                id_requested = 'Id' in seen_columns
+
+                # 2. Deep flatten for display, collecting any other dynamic keys from the
+                # actual data (e.g. toType fields or unparsed ones) in the same pass
                 processed_records = []
                 for record in result['records']:
-                    # Flatten the record
-                    flat = flatten_record(record)
+                    flat = flatten_record(record, columns=all_columns, seen=seen_columns)
                     # Restore top-level attributes for template logic (like ID linking)
                     if 'attributes' in record:
                         flat['attributes'] = record['attributes']
                     processed_records.append(flat)
                 result['records'] = processed_records
-                # --- END NEW LOGIC ---
 
-                # --- Generate all unique columns for the header ---
-                all_columns = []
-                seen_columns = set()
-                
-                # 1. Parse fields from SOQL to ensure requested columns are shown even if data is null
-                try:
-                    # Simple regex to capture content between SELECT and FROM
-                    import re
-                    # Use DOTALL flag to handle newlines
-                    select_match = re.search(r'^\s*SELECT\s+(.+?)\s+FROM\s+', query_text, re.IGNORECASE | re.DOTALL)
-                    
-                    if select_match:
-                        fields_str = select_match.group(1)
-                        # Split by comma, handling simple cases (ignoring nested parens for now for simplicity)
-                        # A more robust parser would balance parentheses for subqueries
-                        raw_fields = [f.strip() for f in fields_str.split(',')]
-                        
-                        for field in raw_fields:
-                            # Handle functions/aliases roughly (e.g., "count(id)" -> "count(id)")
-                            # For simple fields like "Account.Name", just use it
-                            # Skip subqueries "(SELECT ...)" as they are complex to display in flat table
-                            if not field.upper().startswith('(SELECT'):
-                                # Remove potential aliases like "Name n" -> "n" (simplified)
-                                parts = field.split()
-                                col_name = parts[-1] if len(parts) > 1 and parts[-1].upper() not in ['AS'] else field
-                                
-                                all_columns.append(col_name)
-                                seen_columns.add(col_name)
-                except Exception as e:
-                    logger.warning(f"Failed to parse SOQL columns: {e}")
-
-                # 2. Ensure 'Id' is first if present (and not added by parser)
-                if processed_records and 'Id' in processed_records[0] and 'Id' not in seen_columns:
+                # 3. Ensure 'Id' is first if present (and not added by parser)
+                if not id_requested and 'Id' in seen_columns:
+                    all_columns.remove('Id')
                     all_columns.insert(0, 'Id')
-                    seen_columns.add('Id')
-                
-                # 3. Collect any other dynamic keys from actual data (e.g. toType fields or unparsed ones)
-                for record in processed_records:
-                    for key in record.keys():
-                        if key != 'attributes' and key not in seen_columns:
-                            all_columns.append(key)
-                            seen_columns.add(key)
                 
                 # --- END NEW LOGIC ---
 
@@ -267,9 +576,9 @@ class QueryIndexView(View):
             return render(request, self.template_name, context)
             
         except SalesforceAPIError as e:
-            # Save error to history
-            QueryHistory.objects.create(
-                connection=request.sf_connection,
+            # Save error to history; nothing on the error page links to it, so write it off the request path
+            _record_history_later(
+                request.sf_connection,
                 query_text=form.cleaned_data['query'],
                 query_type='soql',
                 status='error',
@@ -278,44 +587,44 @@ class QueryIndexView(View):
             
             logger.error(f"Query execution failed: {e}")
             messages.error(request, f'クエリに失敗しました: {str(e)}')
-            return self.get(request)
+            return self._render_form(request, form)
 
 
 class SearchView(View):
     """SOSL search interface."""
 
     template_name = 'query/search.html'
-    SAMPLE_QUERIES = [
+    SAMPLE_QUERIES = (
         'FIND {Acme} IN ALL FIELDS RETURNING Account(Id, Name), Contact(Id, Name)',
         'FIND {"Tom"} IN NAME FIELDS RETURNING Contact(Id, FirstName, LastName), Lead(Id, Name)',
         'FIND {Partner} IN ALL FIELDS RETURNING Opportunity(Id, Name, StageName)',
-    ]
+    )
 
     def _get_sidebar_data(self, request):
         recent = QueryHistory.objects.filter(
             connection__user=request.user,
             query_type='sosl'
-        ).order_by('-executed_at')[:10]
+        ).order_by('-executed_at').values('query_text', 'executed_at')[:10]
 
         saved = SavedQuery.objects.filter(
             user=request.user,
             query_type='sosl'
-        ).order_by('-updated_at')[:10]
+        ).order_by('-updated_at').values('name', 'query_text')[:10]
         return recent, saved
 
     def _build_context(self, request, form, *, grouped_results=None, summary=None, history=None):
         recent, saved = self._get_sidebar_data(request)
         instance_url = ''
-        connection = getattr(request, 'sf_connection', None)
-        if connection is not None:
-            instance_url = getattr(connection, 'instance_url', '')
+        connection = request.sf_connection
+        if connection:
+            instance_url = connection.instance_url or ''
 
         context = {
             'form': form,
             'recent_searches': recent,
             'saved_searches': saved,
             'search_executed': grouped_results is not None,
-            'grouped_results': grouped_results or [],
+            'grouped_results': grouped_results if grouped_results is not None else (),
             'search_summary': summary,
             'history': history,
             'sample_queries': self.SAMPLE_QUERIES,
@@ -324,24 +633,25 @@ class SearchView(View):
         return context
 
     def _group_results(self, raw_results):
+        """Group SOSL hits by object type; returns ``(grouped_results, total_records)``."""
         grouped = OrderedDict()
+        total_records = 0
 
-        for record in raw_results or []:
+        # Collect each type's field names (an insertion-ordered dict) in the same pass as grouping
+        type_fields = {}
+
+        for record in raw_results or ():
             if not isinstance(record, dict):
                 continue
+            total_records += 1
             attributes = record.get('attributes') or {}
             obj_type = attributes.get('type') or 'Unknown'
             grouped.setdefault(obj_type, []).append(record)
+            type_fields.setdefault(obj_type, {}).update(dict.fromkeys(record))
 
         grouped_results = []
         for obj_type, records in grouped.items():
-            field_names = []
-            for record in records:
-                for field in record.keys():
-                    if field == 'attributes':
-                        continue
-                    if field not in field_names:
-                        field_names.append(field)
+            field_names = [field for field in type_fields[obj_type] if field != 'attributes']
 
             rows = []
             for record in records:
@@ -373,10 +683,12 @@ class SearchView(View):
                 'count': len(records),
             })
 
-        return grouped_results
+        return grouped_results, total_records
 
     def get(self, request):
-        form = SearchForm()
+        return self._render_form(request, SearchForm())
+
+    def _render_form(self, request, form):
         context = self._build_context(request, form)
         return render(request, self.template_name, context)
 
@@ -384,7 +696,7 @@ class SearchView(View):
         form = SearchForm(request.POST)
         if not form.is_valid():
             messages.error(request, '入力内容のエラーを修正してください。')
-            return self.get(request)
+            return self._render_form(request, form)
 
         search_text = form.cleaned_data['search_query']
 
@@ -392,14 +704,15 @@ class SearchView(View):
             client = SalesforceClient(request.sf_connection)
         except AttributeError:
             messages.error(request, '有効な Salesforce 接続がありません。先に認証してください。')
-            return self.get(request)
+            return self._render_form(request, form)
 
         try:
             start_time = time.time()
             raw_results = client.search(search_text) or []
             execution_time = time.time() - start_time
-            total_records = sum(1 for record in raw_results if isinstance(record, dict))
+            grouped_results, total_records = self._group_results(raw_results)
 
+            # Written inline because the export link in the summary needs history.id
             history = QueryHistory.objects.create(
                 connection=request.sf_connection,
                 query_text=search_text,
@@ -408,8 +721,7 @@ class SearchView(View):
                 execution_time=execution_time,
                 record_count=total_records
             )
-
-            grouped_results = self._group_results(raw_results)
+            invalidate_index_page(request.user.pk)
 
             summary = {
                 'total_records': total_records,
@@ -433,8 +745,8 @@ class SearchView(View):
             return render(request, self.template_name, context)
 
         except SalesforceAPIError as exc:
-            QueryHistory.objects.create(
-                connection=request.sf_connection,
+            _record_history_later(
+                request.sf_connection,
                 query_text=search_text,
                 query_type='sosl',
                 status='error',
@@ -443,7 +755,7 @@ class SearchView(View):
 
             logger.error(f"Search execution failed: {exc}")
             messages.error(request, f'検索に失敗しました: {exc}')
-            return self.get(request)
+            return self._render_form(request, form)
 
 
 @require_http_methods(["GET"])
@@ -453,7 +765,7 @@ def query_more(request):
     """
     next_url = request.GET.get('nextRecordsUrl')
     if not next_url:
-        return JsonResponse({'error': 'nextRecordsUrl パラメータが指定されていません'}, status=400)
+        return OrjsonResponse({'error': 'nextRecordsUrl パラメータが指定されていません'}, status=400)
 
     try:
         client = SalesforceClient(request.sf_connection)
@@ -474,7 +786,7 @@ def query_more(request):
                 flat['attributes'] = record['attributes']
             processed_records.append(flat)
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'records': processed_records,
             'done': result.get('done', True),
@@ -484,7 +796,38 @@ def query_more(request):
 
     except SalesforceAPIError as e:
         logger.error(f"Query more failed: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
+        return OrjsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def query_more_stream(request):
+    """
+    Stream the next page of query results as NDJSON, one flattened record per line.
+    Pagination state is returned in the X-Records-Done / X-Next-Records-Url headers.
+    """
+    next_url = request.GET.get('nextRecordsUrl')
+    if not next_url:
+        return OrjsonResponse({'error': 'nextRecordsUrl パラメータが指定されていません'}, status=400)
+
+    try:
+        client = SalesforceClient(request.sf_connection)
+        result = client.query_more(next_url)
+    except SalesforceAPIError as e:
+        logger.error(f"Query more stream failed: {e}")
+        return OrjsonResponse({'error': str(e)}, status=500)
+
+    def ndjson_lines():
+        for record in result.get('records', []):
+            flat = flatten_record(record)
+            if 'attributes' in record:
+                flat['attributes'] = record['attributes']
+            yield orjson.dumps(flat) + b'\n'
+
+    response = StreamingHttpResponse(ndjson_lines(), content_type='application/x-ndjson')
+    response['X-Records-Done'] = 'true' if result.get('done', True) else 'false'
+    if result.get('nextRecordsUrl'):
+        response['X-Next-Records-Url'] = result['nextRecordsUrl']
+    return response
 
 
 class ExportResultsView(View):
@@ -502,18 +845,22 @@ class ExportResultsView(View):
             return redirect('query:index')
         
         try:
-            # Re-execute the query to get fresh results
-            client = SalesforceClient(request.sf_connection)
-            
-            if history.query_type == 'soql':
-                result = client.query(history.query_text)
-                records = result.get('records', [])
-            else:  # sosl
-                result = client.search(history.query_text)
-                # Flatten SOSL results
-                records = []
-                for object_records in result:
-                    records.extend(object_records)
+            # A SOQL result the user viewed in the last few minutes is exported from cache
+            records = _cached_query_records(history.id) if history.query_type == 'soql' else None
+
+            if records is None:
+                # Re-execute the query to get fresh results
+                client = SalesforceClient(request.sf_connection)
+
+                if history.query_type == 'soql':
+                    # Later pages are fetched as the export is written, not up front
+                    records = _iter_query_records(client, client.query(history.query_text))
+                else:  # sosl
+                    result = client.search(history.query_text)
+                    # Flatten SOSL results
+                    records = []
+                    for object_records in result:
+                        records.extend(object_records)
             
             if format_type == 'csv':
                 return self._export_csv(records, history)
@@ -530,72 +877,45 @@ class ExportResultsView(View):
     
     def _export_csv(self, records, history):
         """Export as CSV"""
-        if not records:
+        records = iter(records)
+        first_record = next(records, None)
+        if first_record is None:
             response = HttpResponse('No records to export', content_type='text/plain')
             return response
 
-        # Flatten all records first
-        flattened_records = [flatten_record(r) for r in records]
-
-        # Collect all unique keys from all records to ensure complete header
-        # Using OrderedDict or dict (Python 3.7+) to preserve insertion order if possible
         fieldnames = []
         seen_fields = set()
         
         # 1. Parse fields from SOQL query to ensure requested columns are in header even if data is null
-        try:
-            import re
-            # Use DOTALL flag to handle newlines
-            select_match = re.search(r'^\s*SELECT\s+(.+?)\s+FROM\s+', history.query_text, re.IGNORECASE | re.DOTALL)
-            
-            if select_match:
-                fields_str = select_match.group(1)
-                raw_fields = [f.strip() for f in fields_str.split(',')]
-                
-                for field in raw_fields:
-                    if not field.upper().startswith('(SELECT'):
-                        parts = field.split()
-                        col_name = parts[-1] if len(parts) > 1 and parts[-1].upper() not in ['AS'] else field
-                        
-                        fieldnames.append(col_name)
-                        seen_fields.add(col_name)
-        except Exception as e:
-            logger.warning(f"Failed to parse SOQL columns for export: {e}")
-        
-        # 2. Get keys from the first record data (fallback and supplement)
-        if flattened_records:
-            for key in flattened_records[0].keys():
-                if key != 'attributes' and key not in seen_fields:
-                    fieldnames.append(key)
-                    seen_fields.add(key)
-        
-        # 3. Check other records for any sparse keys
-        for record in flattened_records:
-            for key in record.keys():
-                if key != 'attributes' and key not in seen_fields:
-                    fieldnames.append(key)
-                    seen_fields.add(key)
-
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for record in flattened_records:
-            # Filter record to only include fieldnames (exclude attributes)
-            clean_record = {k: v for k, v in record.items() if k in fieldnames}
-            
-            # Handle None values
-            for k in clean_record:
-                if clean_record[k] is None:
-                    clean_record[k] = ''
-                else:
-                    clean_record[k] = str(clean_record[k])
-            
-            writer.writerow(clean_record)
-        
+        for col_name in _parse_soql_columns(history.query_text):
+            if col_name not in seen_fields:
+                fieldnames.append(col_name)
+                seen_fields.add(col_name)
+
+        # 2. Get keys from the first record data (fallback and supplement). Keys that only
+        # show up in later rows are not added; those cells are simply left blank.
+        first = flatten_record(first_record)
+        for key in first:
+            if key not in seen_fields:
+                fieldnames.append(key)
+                seen_fields.add(key)
+
+        # Pair each column's reader with its formatter once, instead of type-checking
+        # every cell or flattening every record
+        columns = tuple(
+            (_column_reader(field), _csv_formatter_for(first.get(field))) for field in fieldnames
+        )
+
+        # Stream the CSV one positional row at a time
+        writer = csv.writer(_Echo())
+
+        def rows():
+            yield writer.writerow(fieldnames)
+            for record in chain((first_record,), records):
+                yield writer.writerow([fmt(read(record)) for read, fmt in columns])
+
         # Create response
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{history.query_type}_results_{history.id}.csv"'
         
         return response
@@ -615,8 +935,9 @@ class ExportResultsView(View):
             'records': cleaned_records
         }
         
+        # orjson writes datetimes natively; default=str covers anything else
         response = HttpResponse(
-            json.dumps(response_data, indent=2, default=str),
+            orjson.dumps(response_data, default=str, option=orjson.OPT_INDENT_2),
             content_type='application/json'
         )
         response['Content-Disposition'] = f'attachment; filename="{history.query_type}_results_{history.id}.json"'
@@ -647,34 +968,66 @@ class SavedQueryView(View):
     
     def post(self, request):
         """Save a new query"""
+        if 'name[]' in request.POST:
+            return self._post_many(request)
+
         form = SavedQueryForm(request.POST)
         if form.is_valid():
             saved_query = form.save(commit=False)
             saved_query.user = request.user
             saved_query.save()
-            
+            invalidate_index_page(request.user.pk)
+
             messages.success(request, f'クエリ「{saved_query.name}」を保存しました。')
             return redirect('query:saved_queries')
         
-        # If form is invalid, redisplay with errors
-        queries = SavedQuery.objects.filter(user=request.user)
-        paginator = Paginator(queries, 20)
-        page_obj = paginator.get_page(1)
-        
-        context = {
-            'queries': page_obj,
-            'form': form
+        # If form is invalid, report the errors and send the user back to the list
+        # (as _post_many does) rather than rebuilding the paginated list here
+        errors = ' '.join(error for field_errors in form.errors.values() for error in field_errors)
+        messages.error(request, f'クエリを保存できませんでした: {errors}')
+        return redirect('query:saved_queries')
+
+    def _post_many(self, request):
+        """Save several queries at once (e.g. from history) from name[]/query_text[] lists"""
+        names = request.POST.getlist('name[]')
+        query_texts = request.POST.getlist('query_text[]')
+        shared = {
+            'query_type': request.POST.get('query_type', 'soql'),
+            'max_results': request.POST.get('max_results', 2000),
         }
-        return render(request, self.template_name, context)
+        query_forms = [
+            SavedQueryForm({'name': name, 'query_text': query_text, **shared})
+            for name, query_text in zip(names, query_texts)
+        ]
+
+        if not query_forms or len(names) != len(query_texts) or not all(form.is_valid() for form in query_forms):
+            messages.error(request, '保存するクエリの入力内容にエラーがあります。')
+            return redirect('query:saved_queries')
+
+        saved_queries = []
+        for form in query_forms:
+            saved_query = form.save(commit=False)
+            saved_query.user = request.user
+            saved_queries.append(saved_query)
+        SavedQuery.objects.bulk_create(saved_queries, batch_size=100)
+        invalidate_index_page(request.user.pk)
+
+        messages.success(request, f'{len(saved_queries)} 件のクエリを保存しました。')
+        return redirect('query:saved_queries')
 
 
 @require_http_methods(["POST"])
 def delete_saved_query(request, query_id):
     """Delete a saved query"""
-    query = get_object_or_404(SavedQuery, id=query_id, user=request.user)
-    query_name = query.name
-    query.delete()
-    
+    # Read just the name for the message and delete through the queryset, which
+    # issues a single DELETE without loading the model
+    saved = SavedQuery.objects.filter(id=query_id, user=request.user)
+    query_name = saved.values_list('name', flat=True).first()
+    if query_name is None:
+        raise Http404('No SavedQuery matches the given query.')
+    saved.delete()
+    invalidate_index_page(request.user.pk)
+
     messages.success(request, f'クエリ「{query_name}」を削除しました。')
     return redirect('query:saved_queries')
 
@@ -682,12 +1035,13 @@ def delete_saved_query(request, query_id):
 @require_http_methods(["GET"])
 def load_saved_query(request, query_id):
     """Load a saved query into the query interface"""
-    query = get_object_or_404(SavedQuery, id=query_id, user=request.user)
-    
-    if query.query_type == 'soql':
-        return redirect(f'/query/?q={query.id}')
+    # Only the type is needed to pick the target page, so skip the query text
+    query = get_object_or_404(SavedQuery.objects.values('id', 'query_type'), id=query_id, user=request.user)
+
+    if query['query_type'] == 'soql':
+        return redirect(f"/query/?q={query['id']}")
     else:
-        return redirect(f'/query/search/?q={query.id}')
+        return redirect(f"/query/search/?q={query['id']}")
 
 
 class QueryHistoryView(View):
@@ -698,7 +1052,9 @@ class QueryHistoryView(View):
     
     def get(self, request):
         """Display query history"""
-        history = QueryHistory.objects.filter(connection__user=request.user)
+        # The user filter already joins the connection; select it in the same query so
+        # rows that show history.connection don't each issue their own lookup.
+        history = QueryHistory.objects.filter(connection__user=request.user).select_related('connection')
         
         # Filter by query type if specified
         query_type = request.GET.get('type')
@@ -710,8 +1066,8 @@ class QueryHistoryView(View):
         if status in ['success', 'error', 'timeout']:
             history = history.filter(status=status)
         
-        # Paginate results
-        paginator = Paginator(history, 50)
+        # Paginate results without counting the whole filtered history
+        paginator = LookaheadPaginator(history, 50)
         page_number = request.GET.get('page')
         page_obj = paginator.get_page(page_number)
         
@@ -724,141 +1080,102 @@ class QueryHistoryView(View):
 
 
 @require_http_methods(["GET"])
-def get_objects(request):
+@condition(etag_func=_objects_etag)
+@vary_on_cookie
+@require_sf_connection
+def get_objects(request, connection):
     """Get all Salesforce objects for the dropdown"""
     try:
-        logger.info("Loading Salesforce objects for user=%s", request.user if request.user.is_authenticated else 'anonymous')
-        # Prefer middleware provided connection. If missing, try to recover from session/user.
-        connection = getattr(request, 'sf_connection', None)
-        if connection is None:
-            connection_id = request.session.get('sf_connection_id')
-            if connection_id:
-                connection = SalesforceConnection.objects.filter(
-                    id=connection_id,
-                    is_active=True
-                ).first()
-
-        if connection is None and request.user.is_authenticated:
-            connection = SalesforceConnection.objects.filter(
-                user=request.user,
-                is_active=True
-            ).order_by('-updated_at').first()
-
-        if connection is None:
-            return JsonResponse({
-                'success': False,
-                'error': '有効な Salesforce 接続が見つかりません。Salesforce にログインしてください。'
-            }, status=401)
-
-        # Attach for downstream use to keep behaviour consistent with middleware
-        request.sf_connection = connection
+        logger.info("Loading Salesforce objects for user=%s", request.user)
+        # Serve the already-encoded body when we have it; it is the same for every
+        # session on this connection, unlike a cache_page entry keyed by cookie.
+        refresh = _wants_refresh(request)
+        paging = _describe_page(request)
+        body_key = _objects_body_key(connection)
+        if not refresh and paging is None:
+            response = _cached_body_response(request, body_key, _objects_etag_key(connection))
+            if response is not None:
+                return response
 
         client = SalesforceClient(connection)
-        describe_result = client.describe_global()
-
-        # Extract object information
-        objects = []
-        for sobject in describe_result.get('sobjects', []):
-            # Only include queryable objects
-            if sobject.get('queryable'):
-                objects.append({
-                    'name': sobject.get('name'),
-                    'label': sobject.get('label'),
-                    'custom': sobject.get('custom', False),
-                    'keyPrefix': sobject.get('keyPrefix', ''),
-                })
+        objects = get_object_list(client, refresh=refresh)
 
-        # Sort objects by label
-        objects.sort(key=lambda x: x['label'])
+        if paging is not None:
+            if refresh:
+                # The stored ETag describes the old body, so it goes with it
+                cache.delete_many([body_key, _objects_etag_key(connection)])
+            # Pages are sliced from the cached, already sorted list
+            page_objects, page_info = _paginate_list(objects, *paging)
+            return OrjsonResponse({'success': True, 'objects': page_objects, **page_info})
 
-        return JsonResponse({
+        response = OrjsonResponse({
             'success': True,
             'objects': objects
         })
+        _cache_body(body_key, response)
+        return _set_response_etag(response, _objects_etag_key(connection))
 
     except SalesforceAPIError as e:
         logger.error(f"Failed to get objects: {e}")
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
     except Exception as e:
         logger.error(f"Unexpected error in get_objects: {e}")
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': f"An unexpected error occurred: {str(e)}"
         }, status=500)
 
 
 @require_http_methods(["GET"])
-def get_object_fields(request):
+@condition(etag_func=_fields_etag)
+@vary_on_cookie
+@require_sf_connection
+def get_object_fields(request, connection):
     """Get fields for a specific Salesforce object"""
     object_name = request.GET.get('object')
     if not object_name:
-        return JsonResponse({'error': 'Object name is required'}, status=400)
+        return OrjsonResponse({'error': 'Object name is required'}, status=400)
 
     try:
-        logger.info("Loading fields for object=%s user=%s", object_name, request.user if request.user.is_authenticated else 'anonymous')
-        connection = getattr(request, 'sf_connection', None)
-        if connection is None:
-            connection_id = request.session.get('sf_connection_id')
-            if connection_id:
-                connection = SalesforceConnection.objects.filter(
-                    id=connection_id,
-                    is_active=True
-                ).first()
-
-        if connection is None and request.user.is_authenticated:
-            connection = SalesforceConnection.objects.filter(
-                user=request.user,
-                is_active=True
-            ).order_by('-updated_at').first()
-
-        if connection is None:
-            return JsonResponse({
-                'success': False,
-                'error': '有効な Salesforce 接続が見つかりません。Salesforce にログインしてください。'
-            }, status=401)
+        logger.info("Loading fields for object=%s user=%s", object_name, request.user)
 
-        request.sf_connection = connection
+        refresh = _wants_refresh(request)
+        paging = _describe_page(request)
+        body_key = _fields_body_key(connection, object_name)
+        if not refresh and paging is None:
+            response = _cached_body_response(request, body_key, _fields_etag_key(connection, object_name))
+            if response is not None:
+                return response
 
         client = SalesforceClient(connection)
-        describe_result = client.describe_sobject(object_name)
-
-        # Extract field information
-        fields = []
-        for field in describe_result.get('fields', []):
-            fields.append({
-                'name': field.get('name'),
-                'label': field.get('label'),
-                'type': field.get('type'),
-                'length': field.get('length'),
-                'relationshipName': field.get('relationshipName'),
-                'referenceTo': field.get('referenceTo'),
-                'custom': field.get('custom', False),
-                'filterable': field.get('filterable', False),
-                'sortable': field.get('sortable', False),
-                'groupable': field.get('groupable', False),
-                'createable': field.get('createable', False),
-                'updateable': field.get('updateable', False),
-                'nillable': field.get('nillable', False),
+        payload = get_field_payload(client, object_name, refresh=refresh)
+
+        if paging is not None:
+            if refresh:
+                cache.delete_many([body_key, _fields_etag_key(connection, object_name)])
+            page_fields, page_info = _paginate_list(payload['fields'], *paging)
+            return OrjsonResponse({
+                'success': True,
+                'object': object_name,
+                **payload,
+                'fields': page_fields,
+                **page_info,
             })
 
-        # Sort fields by label
-        fields.sort(key=lambda x: x['label'])
-
-        return JsonResponse({
+        response = OrjsonResponse({
             'success': True,
             'object': object_name,
-            'fields': fields,
-            'childRelationships': describe_result.get('childRelationships', []),
-            'recordTypeInfos': describe_result.get('recordTypeInfos', [])
+            **payload,
         })
-
+        _cache_body(body_key, response)
+        return _set_response_etag(response, _fields_etag_key(connection, object_name))
 
     except SalesforceAPIError as e:
         logger.error(f"Failed to get fields for {object_name}: {e}")
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -871,15 +1188,43 @@ def record_detail(request, object_type, record_id):
         # Get Salesforce client
         client = SalesforceClient(request.sf_connection)
 
-        # Get object describe to get all field information
-        describe_result = client.describe_object(object_type)
-
-        # Build query with all fields
-        field_names = [field['name'] for field in describe_result.get('fields', [])]
-        query = f"SELECT {', '.join(field_names)} FROM {object_type} WHERE Id = '{record_id}'"
+        # Both values are interpolated into SOQL, so only accept well-formed IDs
+        # and object names the org actually exposes.
+        if not _RECORD_ID_RE.match(record_id):
+            messages.error(request, f'無効なレコード ID です: {record_id}')
+            return redirect('query:index')
+        # Object names are case-insensitive; the canonical spelling keeps one cache entry per object
+        canonical_type = get_object_names(client).get(object_type.lower())
+        if canonical_type is None:
+            messages.error(request, f'不明なオブジェクトです: {object_type}')
+            return redirect('query:index')
+        object_type = canonical_type
 
-        # Execute query
-        result = client.query(query)
+        # ?fields=Name,Industry limits the query (and the page) to those fields instead of FIELDS(ALL)
+        requested_fields = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+        if not all(_FIELD_NAME_RE.match(name) for name in requested_fields):
+            messages.error(request, '無効な項目名が指定されました。')
+            return redirect('query:index')
+        if requested_fields and 'id' not in {name.lower() for name in requested_fields}:
+            requested_fields.insert(0, 'Id')
+
+        select_list = ', '.join(requested_fields) if requested_fields else 'FIELDS(ALL)'
+        query = f"SELECT {select_list} FROM {object_type} WHERE Id = '{record_id}' LIMIT 1"
+        meta_key = record_fields_cache_key(request.sf_connection, object_type)
+        field_meta = cache.get(meta_key)
+        if field_meta is None:
+            # The select list doesn't depend on the describe, so the record query needn't
+            # wait for it: both are sent to Salesforce in a single composite request.
+            results = client.composite([
+                {'method': 'GET', 'url': f'sobjects/{object_type}/describe', 'referenceId': 'describe'},
+                {'method': 'GET', 'url': f'query/?q={quote(query)}', 'referenceId': 'record'},
+            ])
+            field_meta = build_record_field_meta(results['describe'])
+            cache.set(meta_key, field_meta, DESCRIBE_CACHE_TIMEOUT)
+            result = results['record']
+        else:
+            # Describe metadata is cached, so only the record itself needs fetching
+            result = client.query(query)
 
         if not result.get('records'):
             messages.error(request, f'レコード {record_id} が見つかりません。')
@@ -887,35 +1232,21 @@ def record_detail(request, object_type, record_id):
 
         record = result['records'][0]
 
-        # Prepare field information with values
-        fields_with_values = []
-        for field in describe_result.get('fields', []):
-            field_info = {
-                'label': field.get('label'),
-                'name': field.get('name'),
-                'type': field.get('type'),
-                'value': record.get(field['name']),
-                'updateable': field.get('updateable', False),
-                'createable': field.get('createable', False),
-                'length': field.get('length'),
-                'precision': field.get('precision'),
-                'scale': field.get('scale'),
-                'referenceTo': field.get('referenceTo'),
-                'picklistValues': field.get('picklistValues', []),
-                'nillable': field.get('nillable', False),
-                'calculated': field.get('calculated', False),
-                'custom': field.get('custom', False),
-            }
-            fields_with_values.append(field_info)
+        if requested_fields:
+            wanted = {name.lower() for name in requested_fields}
+            field_meta = [field for field in field_meta if field.name.lower() in wanted]
 
-        # Sort fields by creation order (system fields first, then custom)
-        fields_with_values.sort(key=lambda x: (x['custom'], x['name']))
+        # field_meta is a fresh copy (built or unpickled from the cache), so values
+        # can be attached in place rather than copying every field.
+        get_value = record.get
+        for field in field_meta:
+            field.value = get_value(field.name)
 
         context = {
             'object_type': object_type,
             'record_id': record_id,
             'record': record,
-            'fields': fields_with_values,
+            'fields': field_meta,
             'org_instance': request.sf_connection.instance_url,
         }
 
@@ -934,25 +1265,22 @@ def update_record(request, object_type, record_id):
     try:
         client = SalesforceClient(request.sf_connection)
 
-        # Get the update data from request
-        update_data = {}
-        for key, value in request.POST.items():
-            if key not in ['csrfmiddlewaretoken', 'object_type', 'record_id']:
-                # Convert empty strings to None for null values
-                if value == '':
-                    update_data[key] = None
-                else:
-                    update_data[key] = value
+        # Get the update data from request; empty strings become None (null values)
+        update_data = {
+            key: value if value != '' else None
+            for key, value in request.POST.items()
+            if key not in _UPDATE_EXCLUDED_KEYS
+        }
 
         # Update the record
         client.update_record(object_type, record_id, update_data)
 
         messages.success(request, f'レコード {record_id} を更新しました。')
-        return JsonResponse({'success': True})
+        return OrjsonResponse({'success': True})
 
     except Exception as e:
         logger.error(f"Failed to update record: {e}")
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -969,14 +1297,14 @@ def delete_record(request, object_type, record_id):
         client.delete_record(object_type, record_id)
 
         messages.success(request, f'レコード {record_id} を削除しました。')
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'redirect_url': reverse('query:index')
         })
 
     except Exception as e:
         logger.error(f"Failed to delete record: {e}")
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -984,49 +1312,32 @@ def delete_record(request, object_type, record_id):
 
 @login_required
 @require_http_methods(["POST"])
-def explain_query_view(request):
+@require_sf_connection
+def explain_query_view(request, connection):
     """
     Get query execution plan (explain)
     """
     try:
         query = request.POST.get('query')
         if not query:
-            return JsonResponse({'success': False, 'error': 'Query is required'}, status=400)
+            return OrjsonResponse({'success': False, 'error': 'Query is required'}, status=400)
         
         # Clean the query (similar to execute)
         execution_query = query.replace('\n', ' ').replace('\r', ' ').strip()
-        
-        connection = getattr(request, 'sf_connection', None)
-        if connection is None:
-            connection_id = request.session.get('sf_connection_id')
-            if connection_id:
-                connection = SalesforceConnection.objects.filter(
-                    id=connection_id,
-                    is_active=True
-                ).first()
-
-        if connection is None and request.user.is_authenticated:
-            connection = SalesforceConnection.objects.filter(
-                user=request.user,
-                is_active=True
-            ).order_by('-updated_at').first()
-            
-        if not connection:
-             return JsonResponse({'success': False, 'error': 'No active Salesforce connection'}, status=401)
-             
+
         client = SalesforceClient(connection)
         plans = client.explain_query(execution_query)
         
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'plans': plans
         })
         
     except SalesforceAPIError as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         logger.error(f"Explain view error: {e}")
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return OrjsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
 @login_required
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -125,6 +126,7 @@ try:
     }
     SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
     SESSION_CACHE_ALIAS = 'default'
+    REDIS_AVAILABLE = True
 except (redis.ConnectionError, redis.TimeoutError):
     # Redis not available, use database-backed sessions
     CACHES = {
@@ -134,6 +136,7 @@ except (redis.ConnectionError, redis.TimeoutError):
         }
     }
     SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    REDIS_AVAILABLE = False
     print("Warning: Redis not available, using database for sessions and cache")
 
 # Session configuration
@@ -213,6 +216,10 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
 
+# Background work goes through Celery only when a broker is expected to be up, which
+# by default is when Redis answered above; otherwise it runs inline on the request.
+USE_CELERY = os.getenv('USE_CELERY', str(REDIS_AVAILABLE)).lower() == 'true'
+
 # Logging configuration
 LOGGING = {
     'version': 1,